@@ -1,14 +1,18 @@
 import logging
-import requests
 import json
 import pytz
-from time import sleep
-from typing import List, Dict, Any
+from typing import List, Dict, Tuple, Any, Callable, Optional
+from operator import attrgetter
 from datetime import datetime, timedelta, timezone
 from redzoo.database.simple import SimpleDB
 from auth import Auth
 from eventstream import EventListener
-from utils import print_duration, is_success
+from snapshot import ApplianceSnapshot
+from cache import WriteBehindCache
+from singleflight import SingleFlight
+from retry import Retrier
+from fields import Field, enum_value, merge_fields, field_slots
+from utils import print_duration, is_success, is_offline_error
 
 
 
@@ -19,6 +23,25 @@ class OfflineException(Exception):
     pass
 
 
+class PutRequest:
+
+    # a write command of an appliance. It is performed by the appliance itself or by the async client
+
+    def __init__(self, path: str, data: Dict[str, Any], failure: str, success: str):
+        self.path = path
+        self.data = data
+        self.failure = failure   # the action logged, if the request fails
+        self.success = success   # the message logged, if the request succeeds
+
+
+def handles(*keys: str):
+    # registers the decorated method as handler of the Home Connect keys
+    def register(handler):
+        handler.handled_keys = keys
+        return handler
+    return register
+
+
 class Appliance(EventListener):
 
     ON = "On"
@@ -32,7 +55,67 @@ class Appliance(EventListener):
     STATE_OFF = "OFF"
     VALID_STATES = [STATE_READY, STATE_STARTABLE, STATE_DELAYED_STARTED, STATE_RUNNING, STATE_FINISHED, STATE_OFF]
 
-    def __init__(self, device_uri: str, auth: Auth, name: str, device_type: str, haid: str, brand: str, vib: str, enumber: str, directory: str):
+    FIELDS = [Field('name', title='Name', description='The device name', property='device_name', constant=True),
+              Field('device_type', title='Type', description='The device type', constant=True),
+              Field('haid', title='haid', description='The device haid', property='device_haid', constant=True),
+              Field('brand', title='Brand', description='The device brand', property='device_brand', constant=True),
+              Field('vib', title='Vib', description='The device vib', property='device_vib', constant=True),
+              Field('enumber', title='Enumber', description='The device enumber', property='device_enumber', constant=True),
+              Field('power', 'BSH.Common.Setting.PowerState', transform=lambda raw: enum_value(raw) or Appliance.OFF, title='Power State', description='The power state. See https://api-docs.home-connect.com/settings?#power-state'),
+              Field('door', 'BSH.Common.Status.DoorState', transform=enum_value, title='Door State', description='Door State. See https://api-docs.home-connect.com/states?#door-state'),
+              Field('state', title='State', description='The state (valid values ' + ", ".join(VALID_STATES) + ')'),
+              Field('operation', 'BSH.Common.Status.OperationState', transform=enum_value, title='Operation State', description='The operation state. See https://api-docs.home-connect.com/states?#operation-state'),
+              Field('remote_start_allowed', 'BSH.Common.Status.RemoteControlStartAllowed', default=False, type="boolean", title='Remote Start Allowed State', description='Remote Start Allowance State. See https://api-docs.home-connect.com/states?#remote-start-allowance-state'),
+              Field('program_remote_control_active', 'BSH.Common.Status.RemoteControlActive', default=False, type="boolean", property='remote_control_active', title='Remote Control active', description='Remote Control Active State. See https://api-docs.home-connect.com/states?#remote-control-activation-state'),
+              Field('program_selected', 'BSH.Common.Root.SelectedProgram', transform=enum_value, title='Selected Program', description='Selected Program'),
+              Field('hydrating', type="boolean", title='Hydrating', description='True, if the appliance state is still being loaded'),
+              Field('program_progress', 'BSH.Common.Option.ProgramProgress', default=0, type="number", attribute='_program_progress', title='Progress', description='progress'),
+              Field('program_remaining_time_sec', 'BSH.Common.Option.RemainingProgramTime', default=0, type="integer", property='program_remaining_time', title='Remaining time', description='The remaining time in sec'),
+              Field('child_lock', 'BSH.Common.Setting.ChildLock', default=False, type="boolean", title='child lock', description='True if child lock is active'),
+              Field('program_local_control_active', 'BSH.Common.Status.LocalControlActive', default=False, exposed=False),
+              Field('program_active', 'BSH.Common.Root.ActiveProgram', exposed=False)]
+
+    # no per-instance __dict__. Attributes have to be declared
+    __slots__ = field_slots(FIELDS, '_device_uri', '_auth', 'name', 'device_type', 'haid', 'brand', 'vib', 'enumber', 'hydrating',
+                            'last_refresh', 'refresh_period_sec', 'reload_freshness_sec', '__value_changed_listeners',
+                            '__reload_flight', '__write_retrier', '__db', '__state_cache', '__snapshot', '__restored_options_program', '__previous_run_completed')
+
+    _fields: List[Field] = []
+    _field_attributes: Tuple[str, ...] = ()
+    _key_handlers: Dict[str, Callable] = dict()
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._build_schema()
+
+    @classmethod
+    def _build_schema(cls):
+        # generates the handlers and the transformed properties of the fields declared by the class
+        for field in vars(cls).get('FIELDS', ()):
+            if field.key is not None:
+                field.handle = field.handler(cls)
+            if field.transform is not None and field.name not in vars(cls):
+                setattr(cls, field.name, field.accessor())
+        classes = list(reversed(cls.__mro__))
+        cls._fields = merge_fields(classes)
+        cls._field_attributes = tuple(field.attribute for field in cls._fields if field.key is not None)
+        cls._copy_fields = attrgetter(*cls._field_attributes)
+
+        # merged along the MRO. Handlers of subclasses replace the handlers of their base classes
+        key_handlers = dict()
+        for clazz in classes:
+            for field in vars(clazz).get('FIELDS', ()):
+                if field.key is not None:
+                    key_handlers[field.key] = field.handle
+            for member in vars(clazz).values():
+                for key in getattr(member, 'handled_keys', ()):
+                    key_handlers[key] = member
+        cls._key_handlers = key_handlers
+
+    def __init__(self, device_uri: str, auth: Auth, name: str, device_type: str, haid: str, brand: str, vib: str, enumber: str, directory: str, hydrate: bool = True):
+        for field in self._fields:
+            if field.key is not None:
+                setattr(self, field.attribute, field.default)
         self._device_uri = device_uri
         self._auth = auth
         self.name = name
@@ -43,59 +126,74 @@ class Appliance(EventListener):
         self.enumber = enumber
         self.__value_changed_listeners = set()
         self.last_refresh = datetime.now() - timedelta(hours=9)
-        self.remote_start_allowed = False
-        self.program_remote_control_active = False
-        self._program_selected = ""
-        self.program_remaining_time_sec = 0
-        self.__program_progress = 0
-        self.__program_local_control_active = ""
-        self._power = ""
-        self._door = ""
-        self._operation = ""
-        self.__program_active = ""
-        self.child_lock = False
+        self.refresh_period_sec = 30*60
+        self.reload_freshness_sec = 5
+        self.__reload_flight = SingleFlight()
+        self.__write_retrier = Retrier()
+        self.hydrating = True
         self.__db = SimpleDB(haid + '_db', directory=directory)
-        self._reload_status_and_settings()
-        self._reload_selected_program(ignore_error=True)
+        # the state is read several times per change. The store is written behind, on state transitions only.
+        # The clients flush pending states shortly after the transition
+        self.__state_cache = WriteBehindCache(self.__db)
+        self.__snapshot = ApplianceSnapshot(haid, directory)
+        self.__restored_options_program = ""
+        self.__restore_snapshot()
+        if hydrate:
+            self.hydrate()
 
     def id(self) -> str:
         return self.haid
 
-    @property
-    def power(self):
-        if len(self._power) > 0:
-            return self._power[self._power.rindex('.')+1:]
-        else:
-            return self.OFF
+    def fields(self) -> List[Field]:
+        return self._fields
 
-    @property
-    def door(self):
-        if len(self._door) > 0:
-            return self._door[self._door.rindex('.')+1:]
-        else:
-            return ""
+    def copy_fields(self) -> Tuple:
+        # snapshot of the raw field values in slot order
+        return self._copy_fields(self)
 
-    @property
-    def operation(self):
-        if len(self._operation) > 0:
-            return self._operation[self._operation.rindex('.')+1:]
-        else:
-            return ""
+    def restore_fields(self, values: Tuple):
+        for attribute, value in zip(self._field_attributes, values):
+            setattr(self, attribute, value)
 
-    @property
-    def program_selected(self):
-        if len(self._program_selected) > 0:
-            return self._program_selected[self._program_selected.rindex('.') + 1:]
-        else:
-            return ""
+    def hydrate(self):
+        self._reload_status_and_settings()
+        self._reload_selected_program(ignore_error=True)
+        self._on_hydrated()
 
     @property
     def program_progress(self):
         if self.operation.lower() == 'run':
-            return self.__program_progress
+            return self._program_progress
         else:
             return 0
 
+    def __restore_snapshot(self):
+        try:
+            items = self.__snapshot.load()
+            if items is not None:
+                self._on_values_changed(items, "snapshot", notify_listeners=False)
+                self.__restored_options_program = self.__snapshot.attribute("available_options_program", "")
+                self.hydrating = False
+        except Exception as e:
+            logging.warning(self.name + " error occurred restoring snapshot " + str(e))
+
+    @property
+    def is_state_pending(self) -> bool:
+        return self.__state_cache.is_dirty
+
+    def flush_state(self):
+        try:
+            self.__state_cache.flush()
+        except Exception as e:
+            logging.warning(self.name + " error occurred storing state " + str(e))
+
+    def store_snapshot(self):
+        self.flush_state()
+        try:
+            self.__snapshot.store()
+        except Exception as e:
+            logging.warning(self.name + " error occurred storing snapshot " + str(e))
+
     def register_value_changed_listener(self, value_changed_listener):
         self.__value_changed_listeners.add(value_changed_listener)
         self._notify_listeners()
@@ -106,13 +204,18 @@ class Appliance(EventListener):
 
     @property
     def __state(self) -> str:
-        return self.__db.get("state", self.STATE_READY)
+        return self.__state_cache.get("state", self.STATE_READY)
 
     @state.setter
     def state(self, new_state: str):
-        if self.__state != new_state:
-            logging.info(self.name + " new state: " + new_state + " (previous: " + self.state + ")")
-            self.__db.put("state", new_state)
+        previous_state = self.__state
+        if previous_state != new_state:
+            logging.info(self.name + " new state: " + new_state + " (previous: " + previous_state + ")")
+            self.__state_cache.put("state", new_state)
+
+    @property
+    def state_statistics(self) -> Dict[str, Any]:
+        return self.__state_cache.statistics()
 
     def __update_state(self):
         power = self.power.lower() == self.ON.lower()
@@ -136,7 +239,8 @@ class Appliance(EventListener):
                 self.state = self.OFF
 
     def _notify_listeners(self):
-        self.__update_state()
+        if not self.hydrating:
+            self.__update_state()
         for value_changed_listener in self.__value_changed_listeners:
             value_changed_listener()
 
@@ -149,18 +253,31 @@ class Appliance(EventListener):
 
     def on_keep_alive_event(self, event):
         try:
-            if (self.last_refresh + timedelta(minutes=30)) < datetime.now():
-                self._reload_status_and_settings()
             self._notify_listeners()
         except Exception as e:
             logging.warning("error occurred processing keep alive event "+  str(e))
 
+    def is_refresh_outdated(self, max_age_sec: float = None) -> bool:
+        return (self.last_refresh + timedelta(seconds=self.refresh_period_sec if max_age_sec is None else max_age_sec)) < datetime.now()
+
+    def reload_if_outdated(self, max_age_sec: float = None):
+        # will be triggered periodically by the refresh scheduler
+        if self.is_refresh_outdated(max_age_sec):
+            self._reload_status_and_settings()
+
     def on_notify_event(self, event):
         self._on_value_changed_event(event)
 
     def on_status_event(self, event):
         self._on_value_changed_event(event)
 
+    def on_changes(self, changes: List[Dict[str, Any]]):
+        # applies the coalesced items of several events. Listeners are notified once
+        try:
+            self._on_values_changed(changes, "event received")
+        except Exception as e:
+            logging.warning("error occurred by handling changes " + str(changes) + " " + str(e))
+
     def _on_event_event(self, event):
         logging.debug(self.name + " unhandled event event: " + str(event.data))
 
@@ -173,25 +290,46 @@ class Appliance(EventListener):
             logging.warning("error occurred by handling event " + str(event), e)
 
     def _reload_status_and_settings(self):
+        # concurrent reloads join the running one. Reloads requested shortly after are served by the completed one
+        self.__reload_flight.run(self.__reload_status_and_settings, self.reload_freshness_sec)
+
+    @property
+    def reload_statistics(self) -> Dict[str, Any]:
+        return self.__reload_flight.statistics()
+
+    def __reload_status_and_settings(self):
         self.last_refresh = datetime.now()
         try:
-            status = self._perform_get('/status').get('data', {}).get('status', {})
-            self._on_values_changed(status, "reload status", notify_listeners=False)
-
-            settings = self._perform_get('/settings').get('data', {}).get('settings', {})
-            self._on_values_changed(settings, "reload settings")
+            status = self._perform_get('/status')
+            settings = self._perform_get('/settings')
+            self._on_status_and_settings_reloaded(status, settings)
         except Exception as e:
-            if isinstance(e, OfflineException):
-                self._power = ""
-                logging.info(self.name + " is offline. Could not query current status/settings")
-            else:
-                logging.warning(self.name + " error occurred on refreshing" + str(e))
+            self._on_reload_error(e)
+
+    def _on_status_and_settings_reloaded(self, status: Dict[str, Any], settings: Dict[str, Any]):
+        self._on_values_changed(status.get('data', {}).get('status', {}), "reload status", notify_listeners=False)
+        self._on_values_changed(settings.get('data', {}).get('settings', {}), "reload settings")
+
+    def _on_reload_error(self, e: Exception):
+        if isinstance(e, OfflineException):
+            self._power = ""
+            self.__snapshot.record({'key': 'BSH.Common.Setting.PowerState', 'value': ""})
+            logging.info(self.name + " is offline. Could not query current status/settings")
+        else:
+            logging.warning(self.name + " error occurred on refreshing" + str(e))
+
+    def _on_hydrated(self):
+        if self.hydrating:
+            self.hydrating = False
+            logging.info(self.name + " hydrated")
+            self._notify_listeners()
 
     def _on_values_changed(self, changes: List[Dict[str, Any]], source: str, notify_listeners: bool = True):
         if len(changes) > 0:
             for change in changes:
                 key = str(change.get('key', ""))
                 try:
+                    self.__snapshot.record(change)
                     handled = self._on_value_changed(key, change, source)
                     if not handled:
                         logging.warning(self.name + " unhandled change " + str(change) + " (" + source + ")")
@@ -201,58 +339,22 @@ class Appliance(EventListener):
             self._notify_listeners()
 
     def _on_value_changed(self, key: str, change: Dict[str, Any], source: str) -> bool:
-        if key == 'BSH.Common.Status.DoorState':
-            self._door = change.get('value', "undefined")
-            logging.info(self.name + " field 'door state': " + str(self._door) + " (" + source + ")")
-        elif key == 'BSH.Common.Status.OperationState':
-            self._operation = change.get('value', "undefined")
-            logging.info(self.name + " field 'operation state': " + str(self._operation) + " (" + source + ")")
-        elif key == 'BSH.Common.Status.RemoteControlStartAllowed':
-            self.remote_start_allowed = change.get('value', False)
-            logging.info(self.name + " field 'remote start allowed': " + str(self.remote_start_allowed) + " (" + source + ")")
-        elif key == 'BSH.Common.Setting.PowerState':
-            self._power = change.get('value', None)
-            logging.info(self.name + " field 'power state': " + str(self._power) + " (" + source + ")")
-        elif key == 'BSH.Common.Root.SelectedProgram':
-            self._program_selected = change.get('value', None)
-            logging.info(self.name + " field 'selected program': " + str(self._program_selected) + " (" + source + ")")
-        elif key == 'BSH.Common.Option.ProgramProgress':
-            self.__program_progress = change.get('value', None)
-            logging.info(self.name + " field 'program progress': " + str(self.__program_progress) + " (" + source + ")")
-        elif key == 'BSH.Common.Status.LocalControlActive':
-            self.__program_local_control_active = change.get('value', None)
-        elif key == 'BSH.Common.Status.RemoteControlActive':
-            self.program_remote_control_active = change.get('value', False)
-            logging.info(self.name + " field 'remote control active': " + str(self.program_remote_control_active) + " (" + source + ")")
-        elif key == 'BSH.Common.Setting.ChildLock': # supported by dishwasher, washer, dryer, ..
-            self.child_lock = change.get('value', False)
-            logging.info(self.name + " field 'child lock': " + str(self.child_lock) + " (" + source + ")")
-        elif key == 'BSH.Common.Root.ActiveProgram':
-            self.__program_active = change.get('value', False)
-            logging.info(self.name + " field 'active program': " + str(self.__program_active) + " (" + source + ")")
-        elif key == 'BSH.Common.Option.RemainingProgramTime':   # supported by dishwasher, washer, dryer, ..
-            self.program_remaining_time_sec = change.get('value', 0)
-            logging.info(self.name + " field 'remaining program time': " + str(self.program_remaining_time_sec) + " (" + source + ")")
-        else:
+        handler = self._key_handlers.get(key, None)
+        if handler is None:
             # unhandled change
             return False
+        handler(self, change, source)
         return True
 
     def _reload_selected_program(self, ignore_error: bool = False):
         # query the selected program
         try:
-            selected_data = self._perform_get('/programs/selected').get('data', {})
-            self._program_selected = selected_data.get('key', "")
-            logging.info(self.name + " program selected: " + str(self._program_selected) + " (reload program)")
-            selected_options = selected_data.get('options', "")
-            self._on_values_changed(selected_options, "reload program")
+            self._on_selected_program_reloaded(self._perform_get('/programs/selected'))
 
             # query available options of the selected program
-            if len(self._program_selected) > 0:
+            if self._is_available_program_reload_required():
                 try:
-                    available_data = self._perform_get('/programs/available/' + self._program_selected).get('data', {})
-                    available_options = available_data.get('options', "")
-                    self._on_values_changed(available_options, "reload program")
+                    self._on_available_program_reloaded(self._perform_get('/programs/available/' + self._program_selected))
                 except Exception as e:
                     logging.warning("error occurred fetching program options of " + self._program_selected + " " + str(e))
             self._notify_listeners()
@@ -262,35 +364,65 @@ class Appliance(EventListener):
             else:
                 raise e
 
+    def _on_selected_program_reloaded(self, selected: Dict[str, Any]):
+        selected_data = selected.get('data', {})
+        self._program_selected = selected_data.get('key', "")
+        self.__snapshot.record({'key': 'BSH.Common.Root.SelectedProgram', 'value': self._program_selected})
+        logging.info(self.name + " program selected: " + str(self._program_selected) + " (reload program)")
+        selected_options = selected_data.get('options', "")
+        self._on_values_changed(selected_options, "reload program")
+
+    def _is_available_program_reload_required(self) -> bool:
+        # on hydration, the constraints of the same program are restored by snapshot. Later reloads query them again
+        restored_options_program = self.__restored_options_program
+        self.__restored_options_program = ""
+        return len(self._program_selected) > 0 and restored_options_program != self._program_selected
+
+    def _on_available_program_reloaded(self, available: Dict[str, Any]):
+        available_options = available.get('data', {}).get('options', "")
+        self._on_values_changed(available_options, "reload program")
+        self.__snapshot.set_attribute("available_options_program", self._program_selected)
+
     def _perform_get(self, path:str) -> Dict[str, Any]:
         uri = self._device_uri + path
-        response = requests.get(uri, headers={"Authorization": "Bearer " + self._auth.access_token}, timeout=5000)
+        response = self._auth.session.get(uri, headers={"Authorization": "Bearer " + self._auth.access_token})
         if is_success(response.status_code):
             return response.json()
         else:
-            if response.status_code == 409:
-                msg = response.json()
-                if msg.get("error", {}).get('key', "") == "SDK.Error.HomeAppliance.Connection.Initialization.Failed":
-                    raise OfflineException()
+            if is_offline_error(response.status_code, response.text):
+                raise OfflineException()
             raise Exception("error occurred by calling GET " + uri + " Got " + str(response.status_code) + " " + response.text)
 
-    def _perform_put(self, path:str, data: str, max_trials: int = 3, current_trial: int = 1, verbose: bool = False):
+    def _perform_put_request(self, request: Optional[PutRequest], verbose: bool = False):
+        if request is not None:
+            try:
+                self._perform_put(request.path, json.dumps(request.data, indent=2), max_trials=3, verbose=verbose)
+                logging.info(request.success)
+            except Exception as e:
+                logging.warning("error occurred by " + request.failure + " " + str(e))
+
+    def _perform_put(self, path:str, data: str, max_trials: int = 3, verbose: bool = False):
         uri = self._device_uri + path
         if verbose:
             logging.info("PUT " + uri + "\r\n" + json.dumps(data, indent=2))
-        response = requests.put(uri, data=data, headers={"Content-Type": "application/json", "Authorization": "Bearer " + self._auth.access_token}, timeout=5000)
-        if verbose:
-            logging.info("response code " + str(response.status_code) + "\r\n" + response.text)
-        if not is_success(response.status_code):
-            logging.warning("error occurred by calling PUT (" + str(current_trial) + ". trial) " + uri + " " + data)
-            logging.warning("got " + str(response.status_code) + " " + str(response.text))
-            if current_trial <= max_trials:
-                delay = 1 + current_trial
-                logging.warning("waiting " + str(delay) + " sec for retry")
-                sleep(delay)
-                self._perform_put(path, data, max_trials, current_trial+1)
-            else:
-                response.raise_for_status()
+
+        def put():
+            response = self._auth.session.put(uri, data=data, headers={"Content-Type": "application/json", "Authorization": "Bearer " + self._auth.access_token})
+            if verbose:
+                logging.info("response code " + str(response.status_code) + "\r\n" + response.text)
+            if not is_success(response.status_code):
+                logging.warning("error occurred by calling PUT " + uri + " " + data)
+                logging.warning("got " + str(response.status_code) + " " + str(response.text))
+            return response
+
+        response = self.__write_retrier.execute(put, max_trials=max_trials, name=self.name)
+        if is_offline_error(response.status_code, response.text):
+            raise OfflineException()
+        response.raise_for_status()
+
+    @property
+    def write_statistics(self) -> Dict[str, Any]:
+        return self.__write_retrier.statistics()
 
     @property
     def __fingerprint(self) -> str:
@@ -312,48 +444,43 @@ class Appliance(EventListener):
         return self.__str__()
 
 
+Appliance._build_schema()
+
+
 class Dishwasher(Appliance):
     DeviceType = 'dishwasher'
 
-    def __init__(self, device_uri: str, auth: Auth, name: str, device_type: str, haid: str, brand: str, vib: str, enumber: str, directory: str):
+    FIELDS = [Field('start_date_utc', property='program_start_date_utc', title='Start date', description='The start date', writable=True),
+              Field('program_vario_speed_plus', 'Dishcare.Dishwasher.Option.VarioSpeedPlus', default=False, type="boolean", title='program_vario_speed_plus', description='VarioSpeed Plus Option. See https://api-docs.home-connect.com/programs-and-options?#dishwasher_variospeed-plus-option'),
+              Field('program_hygiene_plus', 'Dishcare.Dishwasher.Option.HygienePlus', default=False, type="boolean", title='program_hygiene_plus', description='Hygiene Plus Option'),
+              Field('program_extra_try', 'Dishcare.Dishwasher.Option.ExtraDry', default=False, type="boolean", title='program_extra_try', description='Extra Try Option'),
+              Field('program_energy_forecast_percent', 'BSH.Common.Option.EnergyForecast', default=0, type="integer", property='program_energy_forecast', title='Energy forecast', description='The energy forecast in %'),
+              Field('program_water_forecast_percent', 'BSH.Common.Option.WaterForecast', default=0, type="integer", property='program_water_forecast', title='Water forecast', description='The water forecast in %')]
+
+    __slots__ = field_slots(FIELDS, '__program_start_in_relative_sec', '__program_start_in_relative_sec_max')
+
+    def __init__(self, device_uri: str, auth: Auth, name: str, device_type: str, haid: str, brand: str, vib: str, enumber: str, directory: str, hydrate: bool = True):
         self.__program_start_in_relative_sec = 0
         self.__program_start_in_relative_sec_max = 86000
-        self.program_extra_try = ""
-        self.program_hygiene_plus = ""
-        self.program_vario_speed_plus = ""
-        self.program_energy_forecast_percent = 0
-        self.program_water_forecast_percent = 0
-        super().__init__(device_uri, auth, name, device_type, haid, brand, vib, enumber, directory)
+        super().__init__(device_uri, auth, name, device_type, haid, brand, vib, enumber, directory, hydrate)
+
+    @handles('BSH.Common.Option.StartInRelative')
+    def _on_start_in_relative(self, change: Dict[str, Any], source: str):
+        if 'value' in change.keys():
+            self.__program_start_in_relative_sec = change['value']
+        if 'constraints' in change.keys():
+            constraints = change['constraints']
+            if 'max' in constraints.keys():
+                self.__program_start_in_relative_sec_max = constraints['max']
+                logging.info(self.name + " field 'start in relative max value': " + str(self.__program_start_in_relative_sec_max) + " (" + source + ")")
 
-    def _on_value_changed(self, key: str, change: Dict[str, Any], source: str) -> bool:
-        if key == 'BSH.Common.Option.StartInRelative':
-            if 'value' in change.keys():
-                self.__program_start_in_relative_sec = change['value']
-            if 'constraints' in change.keys():
-                constraints = change['constraints']
-                if 'max' in constraints.keys():
-                    self.__program_start_in_relative_sec_max = constraints['max']
-                    self.__program_start_in_relative_sec_max = constraints['max']
-                    logging.info(self.name + " field 'start in relative max value': " + str(self.__program_start_in_relative_sec_max) + " (" + source + ")")
-        elif key == 'Dishcare.Dishwasher.Option.ExtraDry':
-            self.program_extra_try = change.get('value', False)
-            logging.info(self.name + " field 'extra try': " + str(self.program_extra_try) + " (" + source + ")")
-        elif key == 'Dishcare.Dishwasher.Option.HygienePlus':
-            self.program_hygiene_plus = change.get('value', False)
-            logging.info(self.name + " field 'hygiene plus': " + str(self.program_hygiene_plus) + " (" + source + ")")
-        elif key == 'Dishcare.Dishwasher.Option.VarioSpeedPlus':
-            self.program_vario_speed_plus = change.get('value', 0)
-            logging.info(self.name + " field 'vario speed plus': " + str(self.program_vario_speed_plus) + " (" + source + ")")
-        elif key == 'BSH.Common.Option.EnergyForecast':
-            self.program_energy_forecast_percent = change.get('value', 0)
-            logging.info(self.name + " field 'energy forecast': " + str(self.program_energy_forecast_percent) + " (" + source + ")")
-        elif key == 'BSH.Common.Option.WaterForecast':
-            self.program_water_forecast_percent = change.get('value', 0)
-            logging.info(self.name + " field 'water forecast': " + str(self.program_water_forecast_percent) + " (" + source + ")")
-        else:
-            # unhandled
-            return super()._on_value_changed(key, change, source)
-        return True
+    @property
+    def start_date_utc(self) -> str:
+        return self.read_start_date_utc()
+
+    @start_date_utc.setter
+    def start_date_utc(self, start_date: str):
+        self.write_start_date_utc(start_date)
 
     def read_start_date_utc(self) -> str:
         start_date = datetime.utcnow() + timedelta(seconds=self.__program_start_in_relative_sec)
@@ -363,110 +490,108 @@ class Dishwasher(Appliance):
             return ""
 
     def write_start_date_utc(self, start_date: str):
+        self._reload_status_and_settings()
+        self._reload_selected_program()  # ensure that selected program is loaded
+        self._perform_put_request(self._start_date_request(start_date))
+        self._notify_listeners()
+
+    def _start_date_request(self, start_date: str) -> Optional[PutRequest]:
+        # requires loaded settings and selected program. Returns None, if the start date is ignored
         start_date_utc = datetime.fromisoformat(start_date)
         if start_date_utc.tzinfo is None:
             start_date_utc = start_date_utc.replace(tzinfo=timezone.utc)
 
-        self._reload_status_and_settings()
-        self._reload_selected_program()  # ensure that selected program is loaded
-
         if len(self._program_selected) == 0:
             logging.warning("ignoring start command. No program selected")
-        else:
-            remaining_secs_to_wait = int((start_date_utc - datetime.now(tz=timezone.utc)).total_seconds())
-            if remaining_secs_to_wait < 0:
-                remaining_secs_to_wait = 0
-            if remaining_secs_to_wait >= self.__program_start_in_relative_sec_max:
-                logging.warning("remaining seconds to wait " + print_duration(remaining_secs_to_wait) + " is larger than max supported value of " + print_duration(self.__program_start_in_relative_sec_max) + ". Ignore setting start date")
-
-            # start in a delayed manner
-            if self.state == self.STATE_STARTABLE:
-                try:
-                    data = {
-                        "data": {
-                            "key": self._program_selected,
-                            "options": [{
-                                "key": "BSH.Common.Option.StartInRelative",
-                                "value": remaining_secs_to_wait,
-                                "unit": "seconds"
-                            }]
-                        }
-                    }
+            return None
 
-                    self._perform_put("/programs/active", json.dumps(data, indent=2), max_trials=3)
-                    logging.info(self.name + " PROGRAMSTRART - program " + self.program_selected +
-                                 " starts in " + print_duration(remaining_secs_to_wait) +
-                                 " (start date " + (datetime.now() + timedelta(seconds=remaining_secs_to_wait)).strftime("%Y-%m-%dT%H:%M") + " utc;" +
-                                 " duration " + print_duration(self.program_remaining_time_sec) + ")")
-                except Exception as e:
-                    logging.warning("error occurred by starting " + self.name + " " + str(e))
-
-            # update start time (already started in a delayed manner)
-            elif self.state == self.STATE_DELAYED_STARTED:
-                try:
-                    data = {
-                        "data": {
-                            "key": "BSH.Common.Option.StartInRelative",
-                            "value": remaining_secs_to_wait,
-                            "unit": "seconds"
-                        }
-                    }
+        remaining_secs_to_wait = int((start_date_utc - datetime.now(tz=timezone.utc)).total_seconds())
+        if remaining_secs_to_wait < 0:
+            remaining_secs_to_wait = 0
+        if remaining_secs_to_wait >= self.__program_start_in_relative_sec_max:
+            logging.warning("remaining seconds to wait " + print_duration(remaining_secs_to_wait) + " is larger than max supported value of " + print_duration(self.__program_start_in_relative_sec_max) + ". Ignore setting start date")
 
-                    self._perform_put("/programs/active/options/BSH.Common.Option.StartInRelative", json.dumps(data, indent=2), max_trials=3)
-                    logging.info(self.name + " update start time: " + self.program_selected +
-                                 " starts in " + print_duration(remaining_secs_to_wait) +
-                                 " (duration " + print_duration(self.program_remaining_time_sec) + ")")
-                except Exception as e:
-                    logging.warning("error occurred by updating start time " + self.name + " " + str(e))
+        # start in a delayed manner
+        if self.state == self.STATE_STARTABLE:
+            data = {
+                "data": {
+                    "key": self._program_selected,
+                    "options": [{
+                        "key": "BSH.Common.Option.StartInRelative",
+                        "value": remaining_secs_to_wait,
+                        "unit": "seconds"
+                    }]
+                }
+            }
+            return PutRequest("/programs/active", data,
+                              "starting " + self.name,
+                              self.name + " PROGRAMSTRART - program " + self.program_selected +
+                              " starts in " + print_duration(remaining_secs_to_wait) +
+                              " (start date " + (datetime.now() + timedelta(seconds=remaining_secs_to_wait)).strftime("%Y-%m-%dT%H:%M") + " utc;" +
+                              " duration " + print_duration(self.program_remaining_time_sec) + ")")
+
+        # update start time (already started in a delayed manner)
+        elif self.state == self.STATE_DELAYED_STARTED:
+            data = {
+                "data": {
+                    "key": "BSH.Common.Option.StartInRelative",
+                    "value": remaining_secs_to_wait,
+                    "unit": "seconds"
+                }
+            }
+            return PutRequest("/programs/active/options/BSH.Common.Option.StartInRelative", data,
+                              "updating start time " + self.name,
+                              self.name + " update start time: " + self.program_selected +
+                              " starts in " + print_duration(remaining_secs_to_wait) +
+                              " (duration " + print_duration(self.program_remaining_time_sec) + ")")
 
-            else:
-                logging.warning("ignoring start command. " + self.name + " is in state " + str(self.state))
-            self._notify_listeners()
+        else:
+            logging.warning("ignoring start command. " + self.name + " is in state " + str(self.state))
+            return None
 
 
 
 
 class FinishInAppliance(Appliance):
 
-    def __init__(self, device_uri: str, auth: Auth, name: str, device_type: str, haid: str, brand: str, vib: str, enumber: str, directory: str):
+    FIELDS = [Field('start_date_utc', property='program_start_date_utc', title='Start date', description='The start date', writable=True),
+              Field('estimated_total_program_time', 'BSH.Common.Option.EstimatedTotalProgramTime', default=0, type="integer", title='Estimated total program time', description='The estimated total program time in sec')]
+
+    __slots__ = field_slots(FIELDS, '_program_finish_in_relative_sec', '__program_finish_in_relative_max_sec', '__program_finish_in_relative_stepsize_sec', '_durations')
+
+    def __init__(self, device_uri: str, auth: Auth, name: str, device_type: str, haid: str, brand: str, vib: str, enumber: str, directory: str, hydrate: bool = True):
         self._program_finish_in_relative_sec = 0
         self.__program_finish_in_relative_max_sec = 86000
         self.__program_finish_in_relative_stepsize_sec = 60
-        self.estimated_total_program_time = ""
         self._durations = SimpleDB(haid + '_durations', directory=directory)
-        super().__init__(device_uri, auth, name, device_type, haid, brand, vib, enumber, directory)
-
-    def _on_value_changed(self, key: str, change: Dict[str, Any], source: str) -> bool:
-        if key == 'BSH.Common.Status.OperationState':
-            operation = change.get('value', "undefined")
-            if operation != self._operation:
-                logging.info(self.name + " field 'operation state': " + str(operation) + ". previous state = " + str(self._operation) + " (" + source + ")")
-                self._operation = operation
-        elif key == 'BSH.Common.Option.FinishInRelative':  # supported by dryer & washer only
-            if 'value' in change.keys():
-                self._program_finish_in_relative_sec = int(change['value'])
-            if 'constraints' in change.keys():
-                constraints = change['constraints']
-                if 'max' in constraints.keys():
-                    self.__program_finish_in_relative_max_sec = constraints['max']
-                    logging.info(self.name + " field 'program_finish_in_relative_max_sec: " + str(self.__program_finish_in_relative_max_sec) + " (" + source + ")")
-                if 'stepsize' in constraints.keys():
-                    self.__program_finish_in_relative_stepsize_sec = constraints['stepsize']
-                    logging.info(self.name + " field 'program_finish_in_relative_stepsize_sec: " + str(self.__program_finish_in_relative_stepsize_sec) + " (" + source + ")")
-        elif key == 'BSH.Common.Root.SelectedProgram':
-            program_selected = change.get('value', None)
-            if program_selected is not None and len(program_selected) > 0:
-                self._program_selected = program_selected
-                logging.info(self.name + " field 'selected program': " + str(self._program_selected) + " (" + source + ")")
-
-        elif key == 'BSH.Common.Option.EstimatedTotalProgramTime':
-            self.estimated_total_program_time = change.get('value', 0)
-            logging.info(self.name + " field 'estimated total program time': " + str(self.estimated_total_program_time) + " (" + source + ")")
-
-        else:
-            # unhandled
-            return super()._on_value_changed(key, change, source)
-        return True
+        super().__init__(device_uri, auth, name, device_type, haid, brand, vib, enumber, directory, hydrate)
+
+    @handles('BSH.Common.Status.OperationState')
+    def _on_operation_state(self, change: Dict[str, Any], source: str):
+        operation = change.get('value', "undefined")
+        if operation != self._operation:
+            logging.info(self.name + " field 'operation state': " + str(operation) + ". previous state = " + str(self._operation) + " (" + source + ")")
+            self._operation = operation
+
+    @handles('BSH.Common.Option.FinishInRelative')  # supported by dryer & washer only
+    def _on_finish_in_relative(self, change: Dict[str, Any], source: str):
+        if 'value' in change.keys():
+            self._program_finish_in_relative_sec = int(change['value'])
+        if 'constraints' in change.keys():
+            constraints = change['constraints']
+            if 'max' in constraints.keys():
+                self.__program_finish_in_relative_max_sec = constraints['max']
+                logging.info(self.name + " field 'program_finish_in_relative_max_sec: " + str(self.__program_finish_in_relative_max_sec) + " (" + source + ")")
+            if 'stepsize' in constraints.keys():
+                self.__program_finish_in_relative_stepsize_sec = constraints['stepsize']
+                logging.info(self.name + " field 'program_finish_in_relative_stepsize_sec: " + str(self.__program_finish_in_relative_stepsize_sec) + " (" + source + ")")
+
+    @handles('BSH.Common.Root.SelectedProgram')
+    def _on_selected_program(self, change: Dict[str, Any], source: str):
+        program_selected = change.get('value', None)
+        if program_selected is not None and len(program_selected) > 0:
+            self._program_selected = program_selected
+            logging.info(self.name + " field 'selected program': " + str(self._program_selected) + " (" + source + ")")
 
     def _program_fingerprint(self) -> str:
         return self._program_selected
@@ -495,6 +620,14 @@ class FinishInAppliance(Appliance):
         else:
             return duration_sec
 
+    @property
+    def start_date_utc(self) -> str:
+        return self.read_start_date_utc()
+
+    @start_date_utc.setter
+    def start_date_utc(self, start_date: str):
+        self.write_start_date_utc(start_date)
+
     def read_start_date_utc(self) -> str:
         if self.operation.lower() == 'delayedstart' and self._program_finish_in_relative_sec > 0:
             start_date = datetime.utcnow() + timedelta(seconds=self._program_finish_in_relative_sec) - timedelta(seconds=self.__program_duration_sec())
@@ -503,13 +636,16 @@ class FinishInAppliance(Appliance):
             return ""
 
     def write_start_date_utc(self, start_date: str):
-        start_date_utc = datetime.fromisoformat(start_date)
-        if start_date_utc.tzinfo is None:
-            start_date_utc = start_date_utc.replace(tzinfo=timezone.utc)
-
         # ensure that current settings and selected program is loaded
         self._reload_status_and_settings()
         self._reload_selected_program()
+        self._perform_put_request(self._start_date_request(start_date), verbose=True)
+
+    def _start_date_request(self, start_date: str) -> Optional[PutRequest]:
+        # requires loaded settings and selected program. Returns None, if the start date is ignored
+        start_date_utc = datetime.fromisoformat(start_date)
+        if start_date_utc.tzinfo is None:
+            start_date_utc = start_date_utc.replace(tzinfo=timezone.utc)
 
         # when startable
         if self.state == self.STATE_STARTABLE:
@@ -539,67 +675,52 @@ class FinishInAppliance(Appliance):
                 if finish_in_relative < 60:
                     logging.info("finish_in_relative " + str(finish_in_relative) + " is < 60 sec. using finish_in_relative=60")
                     finish_in_relative = 60
-                try:
-                    data = {
-                        "data": {
-                            "key": self._program_selected,
-                            "options": [{
-                                "key": "BSH.Common.Option.FinishInRelative",
-                                "value": finish_in_relative,
-                                "unit": "seconds"
-                            }]
-                        }
+                data = {
+                    "data": {
+                        "key": self._program_selected,
+                        "options": [{
+                            "key": "BSH.Common.Option.FinishInRelative",
+                            "value": finish_in_relative,
+                            "unit": "seconds"
+                        }]
                     }
-                    self._perform_put("/programs/active", json.dumps(data, indent=2), max_trials=3, verbose=True)
-                    logging.info(self.name + " PROGRAMSTRART - program " + self.program_selected +
-                                 " starts in " + print_duration(remaining_secs_to_wait) +
-                                 " (start date " + (datetime.now() + timedelta(seconds=remaining_secs_to_wait)).strftime("%Y-%m-%dT%H:%M") + " utc;" +
-                                 " duration " + print_duration(self.program_remaining_time_sec) + ")")
-
-                except Exception as e:
-                    logging.warning("error occurred by starting " + self.name + " with program " + self.program_selected + " at " + start_date + " (duration: " + str(round(program_duration_sec/(60*60), 1)) + " h) " + str(e))
+                }
+                return PutRequest("/programs/active", data,
+                                  "starting " + self.name + " with program " + self.program_selected + " at " + start_date + " (duration: " + str(round(program_duration_sec/(60*60), 1)) + " h)",
+                                  self.name + " PROGRAMSTRART - program " + self.program_selected +
+                                  " starts in " + print_duration(remaining_secs_to_wait) +
+                                  " (start date " + (datetime.now() + timedelta(seconds=remaining_secs_to_wait)).strftime("%Y-%m-%dT%H:%M") + " utc;" +
+                                  " duration " + print_duration(self.program_remaining_time_sec) + ")")
 
         # update end time
         elif self.state == self.STATE_DELAYED_STARTED:
             logging.warning("updating start time currently not supported")
         else:
             logging.warning(self.name + " is in state " + str(self.state) + " Ignoring start command.")
+        return None
 
 
 
 class Washer(FinishInAppliance):
     DeviceType = 'washer'
 
-    def __init__(self, device_uri: str, auth: Auth, name: str, device_type: str, haid: str, brand: str, vib: str, enumber: str, directory: str):
-        self.idos1_baselevel = 0
-        self.idos1_active = False
-        self.idos2_baselevel = 0
-        self.idos2_active = False
-        self.water_forecast = 0
-        self.load_recommendation = 0
-        self.rinse_hold = False
-        self.__spin_speed = ""
-        self.__temperature = ""
-        self.energy_forecast = 0
-        self.intensive_plus = False
-        self.prewash = False
-        self.rinse_plus1 = False
-        self.speed_perfect = False
-        super().__init__(device_uri, auth, name, device_type, haid, brand, vib, enumber, directory)
-
-    @property
-    def spin_speed(self) -> str:
-        if len(self.__spin_speed) > 0:
-            return self.__spin_speed[self.__spin_speed.rindex('.') + 1:]
-        else:
-            return ""
-
-    @property
-    def temperature(self) -> str:
-        if len(self.__temperature) > 0:
-            return self.__temperature[self.__temperature.rindex('.') + 1:]
-        else:
-            return ""
+    FIELDS = [Field('idos1_active', 'LaundryCare.Washer.Option.IDos1.Active', default=False, type="boolean", title='i-Dos 1 active', description='True if i-Dos 1 is active'),
+              Field('idos2_active', 'LaundryCare.Washer.Option.IDos2.Active', default=False, type="boolean", title='i-Dos 2 active', description='True if i-Dos 2 is active'),
+              Field('idos1_baselevel', 'LaundryCare.Washer.Setting.IDos1BaseLevel', default=0, type="number", title='i-Dos 1 base level', description='The i-Dos 1 base level (ml)'),
+              Field('idos2_baselevel', 'LaundryCare.Washer.Setting.IDos2BaseLevel', default=0, type="number", title='i-Dos 2 base level', description='The i-Dos 2 base level (ml)'),
+              Field('temperature', 'LaundryCare.Washer.Option.Temperature', transform=enum_value, title='temperature', description='The temperature'),
+              Field('spin_speed', 'LaundryCare.Washer.Option.SpinSpeed', transform=enum_value, skip_missing=True, title='spin speed', description='The spin speed'),
+              Field('load_recommendation', 'LaundryCare.Common.Option.LoadRecommendation', default=0, type="number", title='Load Recommendation', description='The load recommendation'),
+              Field('energy_forecast', 'BSH.Common.Option.EnergyForecast', default=0, type="number", title='Energy Forecast', description='The energy forecast'),
+              Field('water_forecast', 'BSH.Common.Option.WaterForecast', default=0, type="number", title='Water Forecast', description='The water forecast'),
+              Field('intensive_plus', 'LaundryCare.Washer.Option.IntensivePlus', default=False, type="boolean", title='Intensive Plus', description='True, if intensive plus'),
+              Field('prewash', 'LaundryCare.Washer.Option.Prewash', default=False, type="boolean", title='Pre-wash', description='True, if pre-wash'),
+              Field('rinse_plus1', 'LaundryCare.Washer.Option.RinsePlus1', default=False, type="boolean", title='Rinse Plus 1', description='True, if rinse plus'),
+              Field('speed_perfect', 'LaundryCare.Washer.Option.SpeedPerfect', default=False, type="boolean", title='Speed Perfect', description='True, if speed perfect'),
+              Field('rinse_hold', 'LaundryCare.Washer.Option.RinseHold', default=False, exposed=False),
+              Field('program_duration_hours', type="number", property='program_duration', title='Program Duration', description='The program duration in hours')]
+
+    __slots__ = field_slots(FIELDS)
 
     def _program_fingerprint(self) -> str:
         return self._program_selected + "#" + \
@@ -608,111 +729,22 @@ class Washer(FinishInAppliance):
                str(self.prewash) + "#" + \
                str(self.rinse_plus1)
 
-    def _on_value_changed(self, key: str, change: Dict[str, Any], source: str) -> bool:
-        if key == 'LaundryCare.Washer.Setting.IDos1BaseLevel':
-            self.idos1_baselevel = change.get('value', 0)
-            logging.info(self.name + " field 'idos1 baselevel': " + str(self.idos1_baselevel) + " (" + source + ")")
-        elif key == 'LaundryCare.Washer.Setting.IDos2BaseLevel':
-            self.idos2_baselevel = change.get('value', 0)
-            logging.info(self.name + " field 'idos2 baselevel': " + str(self.idos2_baselevel) + " (" + source + ")")
-        elif key == 'BSH.Common.Option.WaterForecast':
-            self.water_forecast = change.get('value', 0)
-            logging.info(self.name + " field 'water forecast': " + str(self.water_forecast) + " (" + source + ")")
-        elif key == 'LaundryCare.Common.Option.LoadRecommendation':
-            self.load_recommendation = change.get('value', 0)
-            logging.info(self.name + " field 'load recommendation': " + str(self.load_recommendation) + " (" + source + ")")
-        elif key == 'LaundryCare.Washer.Option.IDos1.Active':
-            self.idos1_active = change.get('value', False)
-            logging.info(self.name + " field 'idos1 active': " + str(self.idos1_active) + " (" + source + ")")
-        elif key == 'LaundryCare.Washer.Option.IDos2.Active':
-            self.idos2_active = change.get('value', False)
-            logging.info(self.name + " field 'idos2 active': " + str(self.idos2_active) + " (" + source + ")")
-        elif key == 'LaundryCare.Washer.Option.RinseHold':
-            self.rinse_hold = change.get('value', False)
-            logging.info(self.name + " field 'rinse hold': " + str(self.rinse_hold) + " (" + source + ")")
-        elif key == 'LaundryCare.Washer.Option.SpinSpeed':
-            value = change.get('value', None)
-            if value is not None:
-                self.__spin_speed = value
-                logging.info(self.name + " field 'spin speed': " + str(self.__spin_speed) + " (" + source + ")")
-        elif key == 'LaundryCare.Washer.Option.Temperature':
-            self.__temperature = change.get('value', '')
-            logging.info(self.name + " field 'temperature': " + str(self.__temperature) + " (" + source + ")")
-        elif key == 'BSH.Common.Option.EnergyForecast':
-            self.energy_forecast = change.get('value', 0)
-            logging.info(self.name + " field 'energy forecast': " + str(self.energy_forecast) + " (" + source + ")")
-        elif key == 'LaundryCare.Washer.Option.IntensivePlus':
-            self.intensive_plus = change.get('value', False)
-            logging.info(self.name + " field 'intensive plus': " + str(self.intensive_plus) + " (" + source + ")")
-        elif key == 'LaundryCare.Washer.Option.Prewash':
-            self.prewash = change.get('value', False)
-            logging.info(self.name + " field 'prewash': " + str(self.prewash) + " (" + source + ")")
-        elif key == 'LaundryCare.Washer.Option.RinsePlus1':
-            self.rinse_plus1 = change.get('value', False)
-            logging.info(self.name + " field 'rinse plus 1': " + str(self.rinse_plus1) + " (" + source + ")")
-        elif key == 'LaundryCare.Washer.Option.SpeedPerfect':
-            self.speed_perfect = change.get('value', False)
-            logging.info(self.name + " field 'speed perfect': " + str(self.speed_perfect) + " (" + source + ")")
-        else:
-            # unhandled
-            return super()._on_value_changed(key, change, source)
-        return True
-
 
 
 class Dryer(FinishInAppliance):
 
     DeviceType = 'dryer'
 
-    def __init__(self, device_uri: str, auth: Auth, name: str, device_type: str, haid: str, brand: str, vib: str, enumber: str, directory: str):
-        self.program_gentle = False
-        self.__program_drying_target = ""
-        self.__program_drying_target_adjustment = ""
-        self.__program_wrinkle_guard = ""
-        super().__init__(device_uri, auth, name, device_type, haid, brand, vib, enumber, directory)
+    FIELDS = [Field('program_gentle', 'LaundryCare.Dryer.Option.Gentle', default=False, type="boolean", title='Gentle', description='True if gentle mode is activated'),
+              Field('program_drying_target', 'LaundryCare.Dryer.Option.DryingTarget', transform=enum_value, title='Drying target', description='The drying target'),
+              Field('program_drying_target_adjustment', 'LaundryCare.Dryer.Option.DryingTargetAdjustment', transform=enum_value, title='Drying target adjustment', description='The drying target adjustment'),
+              Field('program_wrinkle_guard', 'LaundryCare.Dryer.Option.WrinkleGuard', transform=enum_value, title='wrinkle guard', description='The wrinkle guard')]
 
-    @property
-    def program_wrinkle_guard(self) -> str:
-        if len(self.__program_wrinkle_guard) > 0:
-            return self.__program_wrinkle_guard[self.__program_wrinkle_guard.rindex('.') + 1:]
-        else:
-            return ""
-
-    @property
-    def program_drying_target(self) -> str:
-        if len(self.__program_drying_target) > 0:
-            return self.__program_drying_target[self.__program_drying_target.rindex('.') + 1:]
-        else:
-            return ""
-
-    @property
-    def program_drying_target_adjustment(self) -> str:
-        if len(self.__program_drying_target_adjustment) > 0:
-            return self.__program_drying_target_adjustment[self.__program_drying_target_adjustment.rindex('.') + 1:]
-        else:
-            return ""
+    __slots__ = field_slots(FIELDS)
 
     def _program_fingerprint(self) -> str:
         return self._program_selected + "#" + \
                str(self.program_gentle) + "#" + \
-               str(self.__program_drying_target) + "#" + \
-               str(self.__program_drying_target_adjustment) + "#" + \
-               str(self.__program_wrinkle_guard)
-
-    def _on_value_changed(self, key: str, change: Dict[str, Any], source: str) -> bool:
-        if key == 'LaundryCare.Dryer.Option.DryingTarget':
-            self.__program_drying_target = change.get('value', "")
-            logging.info(self.name + " field 'program drying target': " + str(self.__program_drying_target) + " (" + source + ")")
-        elif key == 'LaundryCare.Dryer.Option.DryingTargetAdjustment':
-            self.__program_drying_target_adjustment = change.get('value', "")
-            logging.info(self.name + " field 'program_drying target adjustment': " + str(self.__program_drying_target_adjustment) + " (" + source + ")")
-        elif key == 'LaundryCare.Dryer.Option.Gentle':
-            self.program_gentle = change.get('value', False)
-            logging.info(self.name + " field 'program gentle': " + str(self.program_gentle) + " (" + source + ")")
-        elif key == 'LaundryCare.Dryer.Option.WrinkleGuard':
-            self.__program_wrinkle_guard = change.get('value', "")
-            logging.info(self.name + " field 'program wrinkle guard': " + str(self.__program_wrinkle_guard) + " (" + source + ")")
-        else:
-            # unhandled
-            return super()._on_value_changed(key, change, source)
-        return True
+               str(self._program_drying_target) + "#" + \
+               str(self._program_drying_target_adjustment) + "#" + \
+               str(self._program_wrinkle_guard)
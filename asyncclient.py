@@ -0,0 +1,489 @@
+import asyncio
+import json
+import logging
+import ssl
+from os import path
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+from urllib.parse import urlparse, urlencode
+from tornado.httpclient import AsyncHTTPClient, HTTPRequest
+from tornado.ioloop import PeriodicCallback
+from auth import Auth
+from session import HttpSession
+from appliances import Appliance, OfflineException
+from homeconnect import HomeConnect, create_appliance
+from eventstream import EventRouter, EventGapTracker
+from reconnect import ReconnectPolicy, StreamOpenException, tcp_probe
+from sse import SseEvent, SseParser
+from refresh import RefreshScheduler
+from coalesce import EventCoalescer
+from utils import print_duration, is_success, is_offline_error
+
+
+
+async def fetch(session: HttpSession, request: HTTPRequest):
+    # requests are scheduled by the (sync) session's scheduler, so that both clients share the account quota
+    scheduler = session.scheduler
+    trial = 0
+    while True:
+        trial += 1
+        if scheduler is not None:
+            await scheduler.acquire_async()
+        response = await AsyncHTTPClient().fetch(request, raise_error=False)
+        if scheduler is None or not scheduler.on_response(response.code, response.headers) or trial > scheduler.max_retries:
+            return response
+
+
+class AsyncAuth:
+
+    def __init__(self, auth: Auth):
+        self.auth = auth
+        self.__lock = asyncio.Lock()
+
+    async def access_token(self) -> str:
+        if self.auth.fetched_access_token.is_expired():
+            async with self.__lock:
+                # another coroutine may have refreshed the token while waiting for the lock
+                if self.auth.fetched_access_token.is_expired():
+                    logging.info("access token is (almost) expired (" + str(self.auth.fetched_access_token) + "). Requesting new access token")
+                    response = await fetch(self.auth.session, HTTPRequest(Auth.URI + '/oauth/token',
+                                                                          method="POST",
+                                                                          headers={"Content-Type": "application/x-www-form-urlencoded"},
+                                                                          body=urlencode(self.auth.refresh_request_data()),
+                                                                          request_timeout=self.auth.session.timeout_sec))
+                    if not is_success(response.code):
+                        raise Exception("error occurred by requesting access token. Got " + str(response.code) + " " + self.__text(response))
+                    self.auth.on_access_token_fetched(json.loads(response.body))
+        return self.auth.fetched_access_token.token
+
+    @staticmethod
+    def __text(response) -> str:
+        return "" if response.body is None else response.body.decode("UTF-8", errors="replace")
+
+
+class AsyncApplianceClient:
+
+    def __init__(self, appliance: Appliance, auth: AsyncAuth):
+        self.appliance = appliance
+        self.auth = auth
+
+    async def perform_get(self, path: str) -> Dict[str, Any]:
+        uri = self.appliance._device_uri + path
+        response = await self.__fetch(uri, "GET")
+        text = "" if response.body is None else response.body.decode("UTF-8", errors="replace")
+        if is_success(response.code):
+            return json.loads(text)
+        else:
+            if is_offline_error(response.code, text):
+                raise OfflineException()
+            raise Exception("error occurred by calling GET " + uri + " Got " + str(response.code) + " " + text)
+
+    async def perform_put(self, path: str, data: str):
+        uri = self.appliance._device_uri + path
+        response = await self.__fetch(uri, "PUT", data)
+        if not is_success(response.code):
+            text = "" if response.body is None else response.body.decode("UTF-8", errors="replace")
+            raise Exception("error occurred by calling PUT " + uri + " Got " + str(response.code) + " " + text)
+
+    async def __fetch(self, uri: str, method: str, body: str = None):
+        headers = {"Authorization": "Bearer " + await self.auth.access_token()}
+        if body is not None:
+            headers["Content-Type"] = "application/json"
+        return await fetch(self.auth.auth.session, HTTPRequest(uri, method=method, headers=headers, body=body, request_timeout=self.auth.auth.session.timeout_sec))
+
+    async def reload_status_and_settings(self):
+        self.appliance.last_refresh = datetime.now()
+        try:
+            status = await self.perform_get('/status')
+            settings = await self.perform_get('/settings')
+            self.appliance._on_status_and_settings_reloaded(status, settings)
+        except Exception as e:
+            self.appliance._on_reload_error(e)
+
+    async def reload_selected_program(self, ignore_error: bool = False):
+        try:
+            self.appliance._on_selected_program_reloaded(await self.perform_get('/programs/selected'))
+            if self.appliance._is_available_program_reload_required():
+                try:
+                    self.appliance._on_available_program_reloaded(await self.perform_get('/programs/available/' + self.appliance._program_selected))
+                except Exception as e:
+                    logging.warning("error occurred fetching program options of " + self.appliance._program_selected + " " + str(e))
+            self.appliance._notify_listeners()
+        except Exception as e:
+            if not ignore_error:
+                raise e
+
+    async def hydrate(self):
+        await self.reload_status_and_settings()
+        await self.reload_selected_program(ignore_error=True)
+        self.appliance._on_hydrated()
+
+    async def write(self, name: str, value: Any):
+        # the async counterpart of the appliance's setter, e.g. write_start_date_utc for start_date_utc
+        await getattr(self, "write_" + name)(value)
+
+    async def write_start_date_utc(self, start_date: str):
+        # ensure that current settings and selected program is loaded
+        await self.reload_status_and_settings()
+        await self.reload_selected_program()
+        request = self.appliance._start_date_request(start_date)
+        if request is not None:
+            try:
+                await self.perform_put(request.path, json.dumps(request.data, indent=2))
+                logging.info(request.success)
+            except Exception as e:
+                logging.warning("error occurred by " + request.failure + " " + str(e))
+        self.appliance._notify_listeners()
+
+
+class AsyncEventStream:
+
+    def __init__(self, uri: str, auth: AsyncAuth, notify_listener, read_timeout_sec: int, max_lifetime_sec: int, gap_tracker: EventGapTracker = None, policy: ReconnectPolicy = None):
+        self.uri = uri
+        self.auth = auth
+        self.read_timeout_sec = read_timeout_sec
+        self.max_lifetime_sec = max_lifetime_sec
+        self.notify_listener = notify_listener
+        self.gap_tracker = gap_tracker
+        self.policy = policy
+        self.__writer = None
+
+    def close(self, reason: str = None):
+        if self.__writer is not None:
+            if reason is not None:
+                logging.info("closing event stream " + reason)
+            try:
+                self.__writer.close()
+            except Exception as e:
+                pass
+        self.__writer = None
+
+    async def __read(self, awaitable):
+        return await asyncio.wait_for(awaitable, timeout=self.read_timeout_sec)
+
+    async def __chunks(self, reader: asyncio.StreamReader, headers: Dict[str, str]):
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            while True:
+                size_line = (await self.__read(reader.readline())).split(b";")[0].strip()
+                if len(size_line) == 0:   # connection closed (e.g. by close())
+                    return
+                size = int(size_line, 16)
+                if size == 0:
+                    return
+                chunk = await self.__read(reader.readexactly(size + 2))
+                yield chunk[:-2]
+        else:
+            while True:
+                chunk = await self.__read(reader.read(4096))
+                if len(chunk) == 0:
+                    return
+                yield chunk
+
+    async def __open(self):
+        uri = urlparse(self.uri)
+        secure = uri.scheme == "https"
+        port = uri.port if uri.port is not None else (443 if secure else 80)
+        reader, self.__writer = await self.__read(asyncio.open_connection(uri.hostname, port, ssl=ssl.create_default_context() if secure else None))
+        request = "GET " + (uri.path if len(uri.path) > 0 else "/") + ("?" + uri.query if len(uri.query) > 0 else "") + " HTTP/1.1\r\n" + \
+                  "Host: " + uri.netloc + "\r\n" + \
+                  "Accept: text/event-stream\r\n" + \
+                  "Authorization: Bearer " + await self.auth.access_token() + "\r\n" + \
+                  self.__last_event_id_header() + \
+                  "Connection: close\r\n\r\n"
+        self.__writer.write(request.encode("UTF-8"))
+        await self.__writer.drain()
+
+        status_line = (await self.__read(reader.readline())).decode("ISO-8859-1")
+        status_code = int(status_line.split(" ")[1])
+        headers = dict()
+        while True:
+            line = (await self.__read(reader.readline())).decode("ISO-8859-1").strip()
+            if len(line) == 0:
+                break
+            name, _, value = line.partition(":")
+            headers[name.strip().lower()] = value.strip()
+        return reader, status_code, headers
+
+    def __last_event_id_header(self) -> str:
+        if self.gap_tracker is not None and self.gap_tracker.resume_supported and self.gap_tracker.last_event_id is not None:
+            return "Last-Event-ID: " + self.gap_tracker.last_event_id + "\r\n"
+        return ""
+
+    async def consume(self):
+        connect_time = datetime.now()
+        deadline = asyncio.get_running_loop().time() + self.max_lifetime_sec
+        opened = False
+        try:
+            logging.info("opening async event stream connection " + self.uri + " (read timeout: " + print_duration(self.read_timeout_sec) + ", life timeout: " + print_duration(self.max_lifetime_sec) + ")")
+            reader, status_code, headers = await self.__open()
+            if not is_success(status_code):
+                raise StreamOpenException(status_code, "opening event stream returns " + str(status_code))
+
+            opened = True
+            if self.gap_tracker is not None:
+                self.gap_tracker.on_stream_opened()
+            if self.policy is not None:
+                self.policy.on_stream_opened()
+            await self.notify_listener.on_connected(None)
+            logging.info("consuming events...")
+            parser = SseParser()
+            dispatch_table = self.__dispatch_table()
+            try:
+                async for chunk in self.__chunks(reader, headers):
+                    for event in parser.feed(chunk):
+                        if self.gap_tracker is not None:
+                            self.gap_tracker.on_event(event)
+                        handler = dispatch_table.get(event.event, None)
+                        if handler is None:
+                            handler = dispatch_table.get(event.event.upper(), None)
+                        if handler is None:
+                            logging.info("unknown event type " + str(event.event))
+                        else:
+                            await handler(event)
+                    if asyncio.get_running_loop().time() > deadline:
+                        self.close("Max lifetime " + print_duration(self.max_lifetime_sec) + " reached (periodic reconnect)")
+                    if self.__writer is None:
+                        return
+            except Exception as e:
+                if asyncio.get_running_loop().time() > deadline:
+                    self.close("Max lifetime " + print_duration(self.max_lifetime_sec) + " reached (periodic reconnect)")
+                else:
+                    raise e
+        finally:
+            try:
+                if opened and self.gap_tracker is not None:
+                    self.gap_tracker.on_stream_closed()
+                if opened and self.policy is not None:
+                    self.policy.on_stream_closed()
+                self.close()
+                logging.info("event stream closed (elapsed: " + print_duration(int((datetime.now()-connect_time).total_seconds())) + ")")
+            finally:
+                await self.notify_listener.on_disconnected(None)
+
+    def __dispatch_table(self) -> Dict[str, Any]:
+        return {"NOTIFY": self.notify_listener.on_notify_event,
+                "KEEP-ALIVE": self.notify_listener.on_keep_alive_event,
+                "STATUS": self.notify_listener.on_status_event,
+                "EVENT": self.notify_listener.on_event_event,
+                "CONNECTED": self.__on_device_connected,
+                "DISCONNECTED": self.__on_device_disconnected}
+
+    async def __on_device_connected(self, event: SseEvent):
+        logging.info("device reconnected " + str(event))
+        await self.notify_listener.on_connected(event)
+
+    async def __on_device_disconnected(self, event: SseEvent):
+        logging.info("device disconnected " + str(event))
+        await self.notify_listener.on_disconnected(event)
+
+
+class AsyncReconnectingEventStream:
+
+    def __init__(self, uri: str, auth: AsyncAuth, notify_listener, read_timeout_sec: int, max_lifetime_sec: int, gap_tracker: EventGapTracker = None, policy: ReconnectPolicy = None):
+        self.uri = uri
+        self.auth = auth
+        self.read_timeout_sec = read_timeout_sec
+        self.max_lifetime_sec = max_lifetime_sec
+        self.notify_listener = notify_listener
+        self.gap_tracker = gap_tracker
+        self.policy = ReconnectPolicy(probe=tcp_probe(uri)) if policy is None else policy
+        self.stream = None
+        self.is_running = True
+
+    def close(self, reason: str = None):
+        if reason is not None:
+            logging.info("terminating reconnecting event stream " + reason)
+        self.is_running = False
+        if self.stream is not None:
+            self.stream.close()
+
+    async def consume(self):
+        while self.is_running:
+            try:
+                self.stream = AsyncEventStream(self.uri, self.auth, self.notify_listener, self.read_timeout_sec, self.max_lifetime_sec, self.gap_tracker, self.policy)
+                await self.stream.consume()
+            except Exception as e:
+                logging.warning("error has been occurred for event stream " + self.uri + " " + str(e))
+                classification, wait_time_sec = self.policy.on_failure(e)
+                logging.info("try reconnect in " + print_duration(int(wait_time_sec)) + " sec (" + classification + ")...")
+                await self.policy.wait_async(classification, wait_time_sec)
+                logging.info("reconnecting")
+
+
+class AsyncHomeConnect:
+
+    def __init__(self, refresh_token: str, client_secret: str, directory: str, session: HttpSession = None, max_concurrency: int = 8, reconnect_policy: ReconnectPolicy = None, event_batch_window_sec: float = 0.05,
+                 snapshot_period_sec: int = 10*60, state_flush_period_sec: float = 1):
+        self.directory = directory
+        self.max_concurrency = max_concurrency
+        self.auth = Auth(refresh_token, client_secret, session, proactive_refresh=False, token_filename=path.join(directory, Auth.DEFAULT_TOKEN_FILENAME))   # refreshed on demand by the event loop
+        self.async_auth = AsyncAuth(self.auth)
+        self.appliances: List[Appliance] = []
+        self.router = EventRouter()
+        self.gap_tracker = EventGapTracker()
+        self.reconnect_policy = ReconnectPolicy(probe=tcp_probe(HomeConnect.API_URI)) if reconnect_policy is None else reconnect_policy
+        self.refresh_scheduler = RefreshScheduler(self.__submit_refresh, self.auth.session.scheduler, self.gap_tracker.last_event_time)
+        self.coalescer = EventCoalescer(event_batch_window_sec, self.__apply_changes, self.__call_later) if event_batch_window_sec > 0 else None
+        self.__clients: Dict[str, AsyncApplianceClient] = dict()
+        self.__tasks = set()
+        self.__stream = None
+        self.__reload_timer = None
+        self.snapshot_period_sec = snapshot_period_sec
+        self.state_flush_period_sec = state_flush_period_sec
+        self.__store_timers: List[PeriodicCallback] = []
+
+    async def start(self):
+        await self.refresh_devices()
+        self.__stream = AsyncReconnectingEventStream(HomeConnect.API_URI + "/homeappliances/events",
+                                                     self.async_auth,
+                                                     self,
+                                                     read_timeout_sec=3*60,
+                                                     max_lifetime_sec=7*60*60,
+                                                     gap_tracker=self.gap_tracker,
+                                                     policy=self.reconnect_policy)
+        self.__spawn(self.__stream.consume())
+        # the IOLoop serves as timer scheduler of the asynchronous client
+        self.__reload_timer = PeriodicCallback(self.refresh_scheduler.tick, self.refresh_scheduler.tick_sec*1000)
+        self.__reload_timer.start()
+        # files are written by the default executor, not by the IOLoop thread
+        self.__store_timers = [PeriodicCallback(self.__flush_states, self.state_flush_period_sec*1000),
+                               PeriodicCallback(self.__store_snapshots, self.snapshot_period_sec*1000)]
+        for timer in self.__store_timers:
+            timer.start()
+
+    def __flush_states(self):
+        for appliance in self.appliances:
+            if appliance.is_state_pending:
+                asyncio.get_running_loop().run_in_executor(None, appliance.flush_state)
+
+    def __store_snapshots(self):
+        for appliance in self.appliances:
+            asyncio.get_running_loop().run_in_executor(None, appliance.store_snapshot)
+
+    def close(self):
+        if self.__reload_timer is not None:
+            self.__reload_timer.stop()
+        for timer in self.__store_timers:
+            timer.stop()
+        if self.__stream is not None:
+            self.__stream.close("closed")
+        for appliance in self.appliances:
+            appliance.store_snapshot()
+
+    def write(self, appliance: Appliance, name: str, value: Any):
+        # will be called by the IOLoop (webthing property update). The requests are performed without blocking it
+        self.__spawn(self.__write(appliance, name, value))
+
+    async def __write(self, appliance: Appliance, name: str, value: Any):
+        try:
+            await self.__clients[appliance.haid].write(name, value)
+        except Exception as e:
+            logging.warning("error occurred writing " + name + " of " + appliance.name + " " + str(e))
+
+    def __spawn(self, coroutine):
+        task = asyncio.ensure_future(coroutine)
+        self.__tasks.add(task)    # keep a strong reference until done
+        task.add_done_callback(self.__tasks.discard)
+
+    async def refresh_devices(self):
+        uri = HomeConnect.API_URI + "/homeappliances"
+        logging.info("requesting " + uri)
+        response = await fetch(self.auth.session, HTTPRequest(uri, headers={"Authorization": "Bearer " + await self.async_auth.access_token()}, request_timeout=self.auth.session.timeout_sec))
+        if is_success(response.code):
+            fetch_appliances = list()
+            for homeappliances in json.loads(response.body)['data']['homeappliances']:
+                appliance = create_appliance(HomeConnect.API_URI + "/homeappliances/" + homeappliances['haId'],
+                                             self.auth,
+                                             homeappliances['name'],
+                                             homeappliances['type'],
+                                             homeappliances['haId'],
+                                             homeappliances['brand'],
+                                             homeappliances['vib'],
+                                             homeappliances['enumber'],
+                                             self.directory,
+                                             hydrate=False)
+                if appliance is not None:
+                    fetch_appliances.append(appliance)
+                    self.__clients[appliance.haid] = AsyncApplianceClient(appliance, self.async_auth)
+            self.router.reset(fetch_appliances)
+            self.refresh_scheduler.set_appliances(fetch_appliances)
+            self.appliances = fetch_appliances
+            self.__spawn(self.__run_bounded([self.__clients[appliance.haid].hydrate() for appliance in fetch_appliances]))
+        else:
+            raise Exception("error occurred by calling GET " + uri + " Got " + str(response.code))
+
+    async def __run_bounded(self, coroutines: List):
+        semaphore = asyncio.Semaphore(max(1, self.max_concurrency))
+
+        async def run(coroutine):
+            async with semaphore:
+                try:
+                    await coroutine
+                except Exception as e:
+                    logging.warning("error occurred " + str(e))
+
+        await asyncio.gather(*[run(coroutine) for coroutine in coroutines])
+
+    def __assigned(self, event: Optional[SseEvent]) -> Tuple[Appliance, ...]:
+        appliances = self.router.route(event)
+        if self.coalescer is not None:
+            # pending changes have to be applied before handling later events
+            for appliance in appliances:
+                self.coalescer.flush(appliance.haid)
+        return appliances
+
+    @staticmethod
+    def __call_later(delay_sec: float, fn, *args):
+        asyncio.get_running_loop().call_later(delay_sec, fn, *args)
+
+    def __apply_changes(self, haid: str, changes: List[Dict[str, Any]]):
+        appliance = self.router.get(haid)
+        if appliance is not None:
+            appliance.on_changes(changes)
+
+    def __coalesce(self, event: SseEvent) -> bool:
+        if self.coalescer is None or event.id is None:
+            return False
+        for appliance in self.router.route(event):
+            self.coalescer.add(appliance.haid, event)
+        return True
+
+    async def on_connected(self, event):
+        if event is None:
+            # (re)connect of the event stream. The reloads are spawned by the refresh scheduler within the request budget:
+            # the appliances which could have missed changes immediately, the idle ones spread over the catch-up period
+            active, idle = self.gap_tracker.select(self.router.listeners)
+            logging.info("(re)connected. Reloading status/settings of " + str(len(active)) + " appliances (" + str(len(idle)) + " later)")
+            self.refresh_scheduler.request(active)
+            self.refresh_scheduler.request(idle, self.refresh_scheduler.catch_up_sec)
+            self.refresh_scheduler.tick()
+        else:
+            appliances = self.__assigned(event)
+            # reloads run in background. The event stream reader continues immediately
+            self.__spawn(self.__run_bounded([self.__clients[appliance.haid].reload_status_and_settings() for appliance in appliances]))
+
+    async def on_disconnected(self, event):
+        for appliance in self.__assigned(event):
+            appliance.on_disconnected(event)
+
+    def __submit_refresh(self, appliance: Appliance, max_age_sec: float):
+        if appliance.is_refresh_outdated(max_age_sec):
+            self.__spawn(self.__clients[appliance.haid].reload_status_and_settings())
+
+    async def on_keep_alive_event(self, event):
+        for appliance in self.__assigned(event):
+            appliance._notify_listeners()
+
+    async def on_notify_event(self, event):
+        if not self.__coalesce(event):
+            for appliance in self.__assigned(event):
+                appliance.on_notify_event(event)
+
+    async def on_status_event(self, event):
+        if not self.__coalesce(event):
+            for appliance in self.__assigned(event):
+                appliance.on_status_event(event)
+
+    async def on_event_event(self, event):
+        for appliance in self.__assigned(event):
+            appliance.on_event_event(event)
@@ -1,8 +1,14 @@
+import os
+import json
 import logging
-import requests
+import hashlib
 from os import path
+from threading import Lock, Thread
 from datetime import datetime, timedelta
-from typing import Optional
+from typing import Optional, Dict, Any
+from session import HttpSession
+from ratelimit import RequestScheduler
+from timer import TimerScheduler, shared_scheduler
 
 
 class AccessToken:
@@ -19,6 +25,15 @@ class AccessToken:
     def is_expired(self):
         return datetime.now() > (self.expiring_date - timedelta(minutes=5))
 
+    def to_dict(self) -> Dict[str, Any]:
+        return {"token": self.token,
+                "issue_time": self.issue_time.strftime("%Y-%m-%dT%H:%M:%S"),
+                "expires_in_sec": self.expires_in_sec}
+
+    @staticmethod
+    def from_dict(data: Dict[str, Any]):
+        return AccessToken(data['token'], datetime.strptime(data['issue_time'], "%Y-%m-%dT%H:%M:%S"), data['expires_in_sec'])
+
     def __str__(self):
         return "issued: " + self.issue_time.strftime("%d.%b %H:%M") + ", " + \
                "expires: " + self.expiring_date.strftime("%d.%b %H:%M")
@@ -27,23 +42,113 @@ class AccessToken:
 class Auth:
     URI = "https://api.home-connect.com/security"
     DEFAULT_FILENAME = "homeconnect_oauth.txt"
+    DEFAULT_TOKEN_FILENAME = "homeconnect_access_token.json"
+    REFRESH_AHEAD_SEC = 10 * 60   # has to be larger than the expiry margin of AccessToken#is_expired
+    MIN_REFRESH_DELAY_SEC = 30
 
-    def __init__(self, refresh_token: str, client_secret: str):
+    def __init__(self, refresh_token: str, client_secret: str, session: HttpSession = None, proactive_refresh: bool = True, token_filename: str = None, timers: TimerScheduler = None):
         self.refresh_token = refresh_token
         self.client_secret = client_secret
+        self.session = HttpSession(scheduler=RequestScheduler()) if session is None else session
+        self.proactive_refresh = proactive_refresh
+        self.token_filename = token_filename
         self.__fetched_access_token = AccessToken()
+        self.__refresh_lock = Lock()
+        self.timers = shared_scheduler() if timers is None else timers
+        self.__refresh_timer = None
+        self.num_refreshes = 0
+        self.__load_access_token()
 
     @property
     def access_token(self) -> str:
-        if self.__fetched_access_token.is_expired():
-            logging.info("access token is (almost) expired (" + str(self.__fetched_access_token) + "). Requesting new access token")
-            data = {"grant_type": "refresh_token", "refresh_token": self.refresh_token, "client_secret": self.client_secret}
-            response = requests.post(Auth.URI + '/oauth/token', data=data)
-            response.raise_for_status()
-            data = response.json()
-            self.__fetched_access_token = AccessToken(data['access_token'], datetime.now(), data['expires_in'])
-            logging.info("new access token has been created (" + str(self.__fetched_access_token) + ")")
-        return self.__fetched_access_token.token
+        # non-blocking as long as the current token is valid. The background refresher renews it ahead of expiry
+        token = self.__fetched_access_token
+        if token.is_expired():
+            token = self.__refresh(token)
+        return token.token
+
+    def __refresh(self, outdated_token: AccessToken) -> AccessToken:
+        with self.__refresh_lock:
+            # skip, if another thread has already refreshed the token while waiting for the lock
+            if self.__fetched_access_token is outdated_token:
+                logging.info("access token is (almost) expired (" + str(outdated_token) + "). Requesting new access token")
+                response = self.session.post(Auth.URI + '/oauth/token', data=self.refresh_request_data())
+                response.raise_for_status()
+                self.on_access_token_fetched(response.json())
+            return self.__fetched_access_token
+
+    # will be called by the timer thread
+    def __refresh_proactively(self):
+        # the request may block (e.g. pausing for a Retry-After). Timer callbacks have to be short
+        Thread(target=self.__refresh_in_background, name="auth refresh", daemon=True).start()
+
+    # will be called by a background thread
+    def __refresh_in_background(self):
+        try:
+            self.__refresh(self.__fetched_access_token)
+        except Exception as e:
+            logging.warning("error occurred refreshing access token " + str(e))
+            self.__refresh_timer = self.timers.schedule(30, self.__refresh_proactively, name="auth refresh retry")
+
+    @property
+    def fetched_access_token(self) -> AccessToken:
+        return self.__fetched_access_token
+
+    def refresh_request_data(self) -> Dict[str, str]:
+        return {"grant_type": "refresh_token", "refresh_token": self.refresh_token, "client_secret": self.client_secret}
+
+    def on_access_token_fetched(self, data: Dict[str, Any]):
+        self.__fetched_access_token = AccessToken(data['access_token'], datetime.now(), data['expires_in'])
+        self.num_refreshes += 1
+        logging.info("new access token has been created (" + str(self.__fetched_access_token) + ")")
+        self.__store_access_token()
+        self.__schedule_refresh()
+
+    def __schedule_refresh(self):
+        # renews the token ahead of expiry
+        if self.proactive_refresh:
+            if self.__refresh_timer is not None:
+                self.__refresh_timer.cancel()
+            token = self.__fetched_access_token
+            # short-lived tokens are renewed at half of their lifetime. The minimum delay prevents a refresh loop
+            ahead_sec = min(self.REFRESH_AHEAD_SEC, token.expires_in_sec / 2)
+            remaining_sec = (token.expiring_date - datetime.now()).total_seconds() - ahead_sec
+            self.__refresh_timer = self.timers.schedule(max(self.MIN_REFRESH_DELAY_SEC, remaining_sec), self.__refresh_proactively, name="auth refresh")
+
+    @property
+    def __refresh_token_fingerprint(self) -> str:
+        # the access token file must not be used for another account
+        return hashlib.sha256(self.refresh_token.encode("UTF-8")).hexdigest()
+
+    def __store_access_token(self):
+        if self.token_filename is not None:
+            tempname = self.token_filename + ".temp"
+            try:
+                os.makedirs(path.dirname(path.abspath(self.token_filename)), exist_ok=True)
+                with open(os.open(tempname, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), "w") as file:
+                    json.dump({"refresh_token_fingerprint": self.__refresh_token_fingerprint, "access_token": self.__fetched_access_token.to_dict()}, file)
+                os.replace(tempname, self.token_filename)
+            except Exception as e:
+                logging.warning("could not store access token file " + path.abspath(self.token_filename) + " " + str(e))
+            finally:
+                if path.exists(tempname):
+                    os.remove(tempname)
+
+    def __load_access_token(self):
+        if self.token_filename is not None and path.isfile(self.token_filename):
+            try:
+                with open(self.token_filename, "r") as file:
+                    data = json.load(file)
+                if data.get("refresh_token_fingerprint", "") == self.__refresh_token_fingerprint:
+                    access_token = AccessToken.from_dict(data['access_token'])
+                    if access_token.is_expired():
+                        logging.info("stored access token is (almost) expired (" + str(access_token) + "). Ignoring it")
+                    else:
+                        self.__fetched_access_token = access_token
+                        logging.info("using stored access token (" + str(access_token) + ")")
+                        self.__schedule_refresh()
+            except Exception as e:
+                logging.warning("could not load access token file " + path.abspath(self.token_filename) + " " + str(e))
 
     def store(self, filename : str = DEFAULT_FILENAME):
         logging.info("storing secret file " + path.abspath(filename))
@@ -63,7 +168,7 @@ class Auth:
                     refresh_token = refresh_line[refresh_line.index(":")+1:].strip()
                     client_secret_line = file.readline()
                     client_secret = client_secret_line[client_secret_line.index(":")+1:].strip()
-                    return Auth(refresh_token, client_secret)
+                    return Auth(refresh_token, client_secret, token_filename=filename + ".token")
             else:
                 logging.info("secret file " + path.abspath(filename) + " does not exist")
                 return None
@@ -1,12 +1,12 @@
 import uuid
 import webbrowser
-import requests
 from threading import Thread
 from time import sleep
 from string import Template
 from http.server import HTTPServer, BaseHTTPRequestHandler
 from http.cookies import SimpleCookie
 from auth import Auth
+from session import HttpSession
 from urllib.parse import urlparse, parse_qs
 from typing import List
 
@@ -118,6 +118,7 @@ class Authorization:
         self.client_secret = client_secret
         self.scope = scope
         self.auth = None
+        self.http_session = HttpSession(pool_size=1)
         self.start_uri = "http://" + redirect_host + ":" + str(redirect_port)
         self.redirect_server = AuthServer(self, redirect_host, redirect_port)
         self.redirect_server.start()
@@ -137,12 +138,12 @@ class Authorization:
                 "client_secret": self.client_secret,
                 "grant_type": "authorization_code",
                 "code": authorization_code}
-        response = requests.post(Auth.URI + '/oauth/token', data=data)
+        response = self.http_session.post(Auth.URI + '/oauth/token', data=data)
 
         data = response.json()
         refresh_token = data['refresh_token']
         access_token = data['access_token']
-        self.auth = Auth(refresh_token, self.client_secret)
+        self.auth = Auth(refresh_token, self.client_secret, self.http_session)
         self.redirect_server.stop()
         return self.auth
 
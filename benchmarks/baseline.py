@@ -0,0 +1,57 @@
+import sys
+import json
+import shutil
+import tempfile
+import subprocess
+from os import path
+from contextlib import contextmanager
+from typing import Dict, Any, List, Tuple, Iterator
+
+
+REPOSITORY = path.dirname(path.dirname(path.abspath(__file__)))
+
+
+def git(*args: str) -> str:
+    return subprocess.run(["git", "-C", REPOSITORY] + list(args), check=True, capture_output=True, text=True).stdout.strip()
+
+
+def baseline_revision(request_id: str, args: List[str]) -> Tuple[str, List[str]]:
+    # the revision given by "--baseline <revision>". Otherwise the parent of the commit which introduced the change,
+    # i.e. the oldest commit tagged with the request id. Returns the revision and the remaining args
+    if "--baseline" in args:
+        index = args.index("--baseline")
+        if index + 1 >= len(args):
+            raise ValueError("--baseline requires a revision")
+        return git("rev-parse", "--verify", args[index + 1] + "^{commit}"), args[:index] + args[index + 2:]
+    commits = git("log", "--reverse", "--format=%H", "--fixed-strings", "--grep=[" + request_id + "]").splitlines()
+    if len(commits) == 0:
+        raise ValueError("no commit tagged with [" + request_id + "] found. Pass the revision to compare with by --baseline <revision>")
+    return git("rev-parse", commits[0] + "~1"), args
+
+
+@contextmanager
+def exported_tree(revision: str) -> Iterator[str]:
+    # the sources of a former revision, e.g. the implementation replaced by an optimization. Removed on exit
+    directory = tempfile.mkdtemp(prefix="baseline_")
+    try:
+        archive = subprocess.run(["git", "-C", REPOSITORY, "archive", "--format=tar", revision], check=True, capture_output=True).stdout
+        subprocess.run(["tar", "-x", "-C", directory], input=archive, check=True)
+        yield directory
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+def measure_tree(script: str, tree: str, *args: str) -> Dict[str, Any]:
+    # runs the measurement of a benchmark script in a separate interpreter, importing the modules of the given tree
+    output = subprocess.run([sys.executable, script, "--measure", tree] + list(args), check=True, capture_output=True, text=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def is_measure_call() -> bool:
+    return len(sys.argv) > 2 and sys.argv[1] == "--measure"
+
+
+def measure_call(measure):
+    # called by the benchmark script in the separate interpreter. The tree's modules take precedence
+    sys.path.insert(0, sys.argv[2])
+    print(json.dumps(measure(*sys.argv[3:])))
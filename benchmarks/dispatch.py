@@ -0,0 +1,73 @@
+import sys
+import json
+import logging
+import tempfile
+from os import path
+from timeit import repeat
+from typing import List, Dict, Any
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from benchmarks.baseline import REPOSITORY, baseline_revision, exported_tree, measure_tree, is_measure_call, measure_call
+
+
+# a typical washer run: progress and remaining time dominate, followed by status changes and unsupported keys
+EVENT_MIX = [('BSH.Common.Option.ProgramProgress', 42),
+             ('BSH.Common.Option.RemainingProgramTime', 3600),
+             ('BSH.Common.Option.ProgramProgress', 43),
+             ('BSH.Common.Option.RemainingProgramTime', 3540),
+             ('BSH.Common.Status.OperationState', "BSH.Common.EnumType.OperationState.Run"),
+             ('BSH.Common.Status.DoorState', "BSH.Common.EnumType.DoorState.Locked"),
+             ('LaundryCare.Washer.Option.SpinSpeed', "LaundryCare.Washer.EnumType.SpinSpeed.RPM1400"),
+             ('BSH.Common.Option.EnergyForecast', 60),
+             ('BSH.Common.Event.ProgramFinished', "BSH.Common.EnumType.EventPresentState.Off"),
+             ('LaundryCare.Common.Option.VarioPerfect', "LaundryCare.Common.EnumType.VarioPerfect.Off")]
+
+
+def load_mix(filename: str) -> List[Dict[str, Any]]:
+    # the items of all NOTIFY and STATUS events of a recording
+    from sse import SseParser
+    from recording import Recorder
+    parser = SseParser()
+    items = []
+    for record in Recorder.load(filename):
+        if record['k'] == "sse":
+            for event in parser.feed(record['d'].encode("ISO-8859-1")):
+                if event.event in ["NOTIFY", "STATUS"]:
+                    items.extend(json.loads(event.data).get('items', []))
+    return items
+
+
+def measure(items_filename: str, rounds: str) -> Dict[str, Any]:
+    # the washer of the measured tree, including the handler bodies
+    from appliances import Washer
+    logging.disable(logging.CRITICAL)
+    with open(items_filename) as file:
+        items = json.load(file)
+    with tempfile.TemporaryDirectory() as directory:
+        washer = Washer("uri", None, "washer", "Washer", "HAID-1", "brand", "vib", "enumber", directory, hydrate=False)
+        # the best of 5 repetitions
+        elapsed = min(repeat(lambda: [washer._on_value_changed(item['key'], item, "benchmark") for item in items], number=int(rounds), repeat=5))
+    return {"us_per_item": round(elapsed * 1000000 / (len(items) * int(rounds)), 3)}
+
+
+def run(baseline_revision: str, filename: str = None, rounds: int = 2000):
+    # the baseline is the revision before the key handler table. Its appliances dispatch through the elif chains
+    items = load_mix(filename) if filename is not None else [{'key': key, 'value': value} for key, value in EVENT_MIX]
+    with tempfile.TemporaryDirectory() as directory:
+        items_filename = path.join(directory, "items.json")
+        with open(items_filename, "w") as file:
+            json.dump(items, file)
+        with exported_tree(baseline_revision) as tree:
+            baseline = measure_tree(__file__, tree, items_filename, str(rounds))
+        current = measure_tree(__file__, REPOSITORY, items_filename, str(rounds))
+    print("items: " + str(len(items)))
+    print("elif chain (" + baseline_revision[:7] + ")  (us/item): " + str(baseline["us_per_item"]))
+    print("key table  (working tree)  (us/item): " + str(current["us_per_item"]))
+
+
+if __name__ == '__main__':
+    if is_measure_call():
+        measure_call(measure)
+    else:
+        # dispatch.py [--baseline <revision>] [<recording>]
+        revision, args = baseline_revision("user-022", sys.argv[1:])
+        run(revision, args[0] if len(args) > 0 else None)
@@ -0,0 +1,62 @@
+import sys
+import logging
+import tempfile
+import tracemalloc
+from os import path
+from timeit import repeat
+from typing import Dict, Any
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from benchmarks.baseline import REPOSITORY, baseline_revision, exported_tree, measure_tree, is_measure_call, measure_call
+from benchmarks.dispatch import EVENT_MIX
+
+
+
+def allocated_bytes(fn, rounds: int) -> int:
+    tracemalloc.start()
+    fn()
+    before = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for _ in range(rounds):
+        fn()
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return peak - before
+
+
+def measure(rounds: str) -> Dict[str, Any]:
+    # an event of the measured tree: its changes are applied by the washer and pushed by the washer thing
+    from appliances import Washer
+    from appliances_webthing import WasherThing
+    # INFO is disabled: lazy formatted log lines are not built at all
+    logging.getLogger().setLevel(logging.WARNING)
+    items = [{'key': key, 'value': value} for key, value in EVENT_MIX[:4]]
+    with tempfile.TemporaryDirectory() as directory:
+        washer = Washer("uri", None, "washer", "Washer", "HAID-1", "brand", "vib", "enumber", directory, hydrate=False)
+        thing = WasherThing("benchmark", washer)
+
+        def handle_event():
+            for item in items:
+                washer._on_value_changed(item['key'], item, "benchmark")
+            thing._on_value_changed(washer)
+
+        # the best of 5 repetitions
+        return {"us_per_event": round(min(repeat(handle_event, number=int(rounds), repeat=5)) * 1000000 / int(rounds), 2),
+                "allocated_peak_bytes": allocated_bytes(handle_event, 100)}
+
+
+def run(baseline_revision: str, rounds: int = 2000):
+    # the baseline is the revision before the field schema. Its handlers, properties and change push are handwritten
+    with exported_tree(baseline_revision) as tree:
+        baseline = measure_tree(__file__, tree, str(rounds))
+    current = measure_tree(__file__, REPOSITORY, str(rounds))
+    print("handwritten (" + baseline_revision[:7] + ")  (us/event): " + str(baseline["us_per_event"]) + " allocated peak (bytes): " + str(baseline["allocated_peak_bytes"]))
+    print("generated   (working tree)  (us/event): " + str(current["us_per_event"]) + " allocated peak (bytes): " + str(current["allocated_peak_bytes"]))
+
+
+if __name__ == '__main__':
+    if is_measure_call():
+        measure_call(measure)
+    else:
+        # fields.py [--baseline <revision>]
+        revision, _ = baseline_revision("user-023", sys.argv[1:])
+        run(revision)
@@ -0,0 +1,59 @@
+import sys
+import logging
+import tempfile
+import tracemalloc
+from os import path
+from timeit import timeit
+from typing import Dict, Any, Callable
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from benchmarks.baseline import REPOSITORY, baseline_revision, exported_tree, measure_tree, is_measure_call, measure_call
+
+
+
+def traced_kib(create: Callable, count: int) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    instances = [create(index) for index in range(count)]
+    allocated = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del instances
+    return round(allocated / 1024, 1)
+
+
+def measure(count: str) -> Dict[str, Any]:
+    # the appliances of the measured tree
+    from appliances import Dishwasher, Dryer, Washer
+    logging.disable(logging.CRITICAL)
+    count = int(count)
+    measured = dict()
+    with tempfile.TemporaryDirectory() as directory:
+        for clazz in [Dishwasher, Washer, Dryer]:
+            total = traced_kib(lambda index: clazz("uri", None, "name", clazz.DeviceType, "HAID-" + str(index), "brand", "vib", "enumber", directory, hydrate=False), count)
+            instance = clazz("uri", None, "name", clazz.DeviceType, "HAID", "brand", "vib", "enumber", directory, hydrate=False)
+            attributes = sys.getsizeof(instance) + (sys.getsizeof(vars(instance)) if hasattr(instance, '__dict__') else 0)
+            measured[clazz.__name__.lower()] = {"attributes_kib": round(attributes * count / 1024, 1),
+                                                "total_kib": total,
+                                                "copy_fields_us": round(timeit(instance.copy_fields, number=10000) * 1000000 / 10000, 2) if hasattr(instance, 'copy_fields') else None}
+    return measured
+
+
+def run(baseline_revision: str, count: int = 1000):
+    # the baseline is the revision before the slot layout. Its appliances hold their attributes in a per-instance __dict__
+    with exported_tree(baseline_revision) as tree:
+        baseline = measure_tree(__file__, tree, str(count))
+    current = measure_tree(__file__, REPOSITORY, str(count))
+    print("per " + str(count) + " appliances (KiB). before: " + baseline_revision[:7] + " (__dict__), after: working tree (slots)")
+    for name in baseline.keys():
+        print(name +
+              "  instance + attributes: " + str(baseline[name]["attributes_kib"]) + " -> " + str(current[name]["attributes_kib"]) +
+              "  appliance total: " + str(baseline[name]["total_kib"]) + " -> " + str(current[name]["total_kib"]) +
+              "  copy_fields (us): " + str(current[name]["copy_fields_us"]))
+
+
+if __name__ == '__main__':
+    if is_measure_call():
+        measure_call(measure)
+    else:
+        # memory.py [--baseline <revision>] [<count>]
+        revision, args = baseline_revision("user-024", sys.argv[1:])
+        run(revision, int(args[0]) if len(args) > 0 else 1000)
@@ -0,0 +1,54 @@
+import sys
+from os import path
+from timeit import timeit
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from eventstream import EventListener, EventRouter
+
+
+
+class CountingListener(EventListener):
+
+    def __init__(self, haid: str):
+        self.haid = haid
+        self.num_events = 0
+
+    def id(self) -> str:
+        return self.haid
+
+    def on_notify_event(self, event):
+        self.num_events += 1
+
+
+class Event:
+
+    def __init__(self, id: str):
+        self.id = id
+
+
+def dispatch_linear(listeners, event):
+    # the former HomeConnect dispatch: walk all listeners on each event
+    for listener in listeners:
+        if event is None or event.id is None or event.id == listener.id():
+            listener.on_notify_event(event)
+
+
+def dispatch_routed(router: EventRouter, event):
+    for listener in router.route(event):
+        listener.on_notify_event(event)
+
+
+def run(num_events: int = 20000):
+    print("appliances   linear (us/event)   routed (us/event)")
+    for num_appliances in [1, 10, 100, 1000]:
+        listeners = [CountingListener("HAID-" + str(i)) for i in range(num_appliances)]
+        router = EventRouter()
+        for listener in listeners:
+            router.register(listener)
+        events = [Event("HAID-" + str(i % num_appliances)) for i in range(num_events)]
+        linear = timeit(lambda: [dispatch_linear(listeners, event) for event in events], number=1)
+        routed = timeit(lambda: [dispatch_routed(router, event) for event in events], number=1)
+        print(str(num_appliances).rjust(10) + str(round(linear * 1000000 / num_events, 2)).rjust(20) + str(round(routed * 1000000 / num_events, 2)).rjust(20))
+
+
+if __name__ == '__main__':
+    run()
@@ -0,0 +1,92 @@
+import sys
+import json
+from os import path
+from timeit import timeit
+from datetime import datetime, timedelta
+from time import monotonic
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from sse import SseParser
+
+
+
+def create_stream(num_events: int) -> bytes:
+    lines = []
+    for i in range(num_events):
+        if i % 10 == 0:
+            lines.append("event: KEEP-ALIVE\ndata:\n\n")
+        else:
+            data = json.dumps({"items": [{"key": "BSH.Common.Option.ProgramProgress", "value": i % 100, "uri": "/api/homeappliances/HAID-" + str(i % 20) + "/programs/active/options/BSH.Common.Option.ProgramProgress", "timestamp": 1700000000 + i, "level": "hint", "handling": "none"}]})
+            lines.append("data: " + data + "\nevent: " + ("NOTIFY" if i % 2 == 0 else "STATUS") + "\nid: HAID-" + str(i % 20) + "\n\n")
+    return "".join(lines).encode("UTF-8")
+
+
+def chunks(stream: bytes, chunk_size: int):
+    return [stream[pos:pos + chunk_size] for pos in range(0, len(stream), chunk_size)]
+
+
+class NoopListener:
+
+    def __init__(self):
+        self.num_events = 0
+
+    def on_notify_event(self, event):
+        self.num_events += 1
+
+    def on_keep_alive_event(self, event):
+        self.num_events += 1
+
+    def on_status_event(self, event):
+        self.num_events += 1
+
+    def on_event_event(self, event):
+        self.num_events += 1
+
+
+def consume_sseclient(stream_chunks, listener: NoopListener):
+    # the former EventStream#consume path
+    import sseclient
+    connect_time = datetime.now()
+    for event in sseclient.SSEClient(iter(stream_chunks)).events():
+        next_reconnect_date = connect_time + timedelta(seconds=7*60*60)
+        remaining_secs_next_reconnect = round((next_reconnect_date - datetime.now()).total_seconds())
+        if event.event.upper() == "NOTIFY":
+            listener.on_notify_event(event)
+        elif event.event.upper() == "KEEP-ALIVE":
+            listener.on_keep_alive_event(event)
+        elif event.event.upper() == "STATUS":
+            listener.on_status_event(event)
+        elif event.event.upper() == "EVENT":
+            listener.on_event_event(event)
+
+
+def consume_builtin(stream_chunks, listener: NoopListener):
+    deadline = monotonic() + 7*60*60
+    dispatch_table = {"NOTIFY": listener.on_notify_event,
+                      "KEEP-ALIVE": listener.on_keep_alive_event,
+                      "STATUS": listener.on_status_event,
+                      "EVENT": listener.on_event_event}
+    parser = SseParser()
+    for chunk in stream_chunks:
+        for event in parser.feed(chunk):
+            handler = dispatch_table.get(event.event, None)
+            if handler is not None:
+                handler(event)
+            if monotonic() > deadline:
+                return
+
+
+def run(num_events: int = 20000, chunk_size: int = 512):
+    stream_chunks = chunks(create_stream(num_events), chunk_size)
+    builtin_listener = NoopListener()
+    builtin = timeit(lambda: consume_builtin(stream_chunks, builtin_listener), number=1)
+    print("built-in parser: " + str(round(builtin * 1000000 / num_events, 2)) + " us/event (" + str(builtin_listener.num_events) + " events)")
+    try:
+        sseclient_listener = NoopListener()
+        former = timeit(lambda: consume_sseclient(stream_chunks, sseclient_listener), number=1)
+        print("sseclient:       " + str(round(former * 1000000 / num_events, 2)) + " us/event (" + str(sseclient_listener.num_events) + " events)")
+    except ImportError:
+        print("sseclient is not installed (pip install sseclient-py). Skipping comparison")
+
+
+if __name__ == '__main__':
+    run()
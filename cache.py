@@ -0,0 +1,70 @@
+from threading import Lock
+from typing import Dict, Any, Set
+from redzoo.database.simple import SimpleDB
+
+
+
+class WriteBehindCache:
+
+    # the values are held in memory. The store is read once per key, and changed values are written
+    # when flushed (e.g. together with the periodic snapshot) instead of on each change
+
+    __MISSING = object()
+
+    def __init__(self, db: SimpleDB):
+        self.__db = db
+        self.__lock = Lock()
+        self.__values: Dict[str, Any] = dict()
+        self.__dirty: Set[str] = set()
+        self.num_memory_reads = 0
+        self.num_store_reads = 0
+        self.num_changes = 0
+        self.num_store_writes = 0
+
+    def get(self, key: str, default_value: Any = None) -> Any:
+        value = self.__values.get(key, self.__MISSING)
+        if value is self.__MISSING:
+            with self.__lock:
+                value = self.__values.get(key, self.__MISSING)
+                if value is self.__MISSING:
+                    self.num_store_reads += 1
+                    value = self.__values[key] = self.__db.get(key, default_value)
+                    return value
+        self.num_memory_reads += 1
+        return value
+
+    def put(self, key: str, value: Any) -> bool:
+        # returns True, if the value has changed
+        with self.__lock:
+            if self.__values.get(key, self.__MISSING) == value:
+                return False
+            self.__values[key] = value
+            self.__dirty.add(key)
+            self.num_changes += 1
+            return True
+
+    def flush(self):
+        with self.__lock:
+            changed = {key: self.__values[key] for key in self.__dirty}
+            self.__dirty.clear()
+        pending = list(changed.keys())
+        try:
+            for key in list(pending):
+                self.__db.put(key, changed[key])
+                pending.remove(key)
+                self.num_store_writes += 1
+        except Exception as e:
+            with self.__lock:
+                self.__dirty.update(pending)   # retried by the next flush
+            raise e
+
+    @property
+    def is_dirty(self) -> bool:
+        return len(self.__dirty) > 0
+
+    def statistics(self) -> Dict[str, Any]:
+        return {"memory_reads": self.num_memory_reads,
+                "store_reads": self.num_store_reads,
+                "changes": self.num_changes,
+                "store_writes": self.num_store_writes,
+                "pending": len(self.__dirty)}
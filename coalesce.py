@@ -0,0 +1,74 @@
+import json
+import logging
+from threading import Lock
+from typing import Callable, List, Dict, Any
+
+
+
+class EventCoalescer:
+
+    # NOTIFY/STATUS events of an appliance arriving within the window are merged and applied at once.
+    # Only the latest value of a key is kept. The other attributes of the key's items (e.g. constraints, unit) are merged
+
+    def __init__(self, window_sec: float, flush: Callable[[str, List[Dict[str, Any]]], None], call_later: Callable):
+        # call_later(delay_sec, fn, *args) is served by the timer scheduler or by the IOLoop.
+        # flush(haid, changes) is called under the lock to keep the order of flushes. It has to be short (e.g. a hand-off)
+        self.window_sec = window_sec
+        self.__flush = flush
+        self.__call_later = call_later
+        self.__lock = Lock()
+        self.__pending: Dict[str, Dict[str, Dict[str, Any]]] = dict()
+        self.__pending_events: Dict[str, int] = dict()
+        self.num_batches = 0
+        self.num_events = 0
+        self.num_items = 0
+        self.num_applied_items = 0
+        self.max_batch_events = 0
+
+    def add(self, haid: str, event):
+        items = json.loads(event.data).get('items', [])
+        with self.__lock:
+            pending = self.__pending.get(haid, None)
+            is_first = pending is None
+            if is_first:
+                pending = self.__pending[haid] = dict()
+                self.__pending_events[haid] = 0
+            self.__pending_events[haid] += 1
+            for item in items:
+                key = str(item.get('key', ""))
+                merged = pending.pop(key, None)   # the latest change moves to the end
+                pending[key] = item if merged is None else {**merged, **item}
+            self.num_items += len(items)
+        if is_first:
+            self.__call_later(self.window_sec, self.flush, haid)
+
+    def flush(self, haid: str):
+        with self.__lock:
+            pending = self.__pending.pop(haid, None)
+            num_events = self.__pending_events.pop(haid, 0)
+            if pending is None:
+                return
+            self.num_batches += 1
+            self.num_events += num_events
+            self.num_applied_items += len(pending)
+            self.max_batch_events = max(self.max_batch_events, num_events)
+            # a concurrent flush of later events must not overtake these changes
+            try:
+                self.__flush(haid, list(pending.values()))
+            except Exception as e:
+                logging.warning("error occurred applying changes of " + haid + " " + str(e))
+
+    def flush_all(self):
+        with self.__lock:
+            haids = list(self.__pending.keys())
+        for haid in haids:
+            self.flush(haid)
+
+    def statistics(self) -> Dict[str, Any]:
+        with self.__lock:
+            return {"batches": self.num_batches,
+                    "events": self.num_events,
+                    "items": self.num_items,
+                    "applied_items": self.num_applied_items,
+                    "max_batch_events": self.max_batch_events,
+                    "avg_batch_events": round(self.num_events / self.num_batches, 2) if self.num_batches > 0 else 0}
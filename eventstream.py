@@ -1,17 +1,22 @@
 import logging
-import requests
-import sseclient
 from abc import ABC, abstractmethod
-from time import sleep
-from threading import Thread
-from datetime import datetime, timedelta
+from time import monotonic
+from threading import Thread, Condition, Lock
+from collections import deque
+from datetime import datetime
+from typing import Dict, Tuple, Any, Optional
 from auth import Auth
 from utils import print_duration
+from sse import iter_events
+from reconnect import ReconnectPolicy, StreamOpenException, tcp_probe
+from timer import TimerScheduler, Timer, shared_scheduler
 
 
 
 class EventListener(ABC):
 
+    __slots__ = ()
+
     @abstractmethod
     def id(self) -> str:
         pass
@@ -35,6 +40,222 @@ class EventListener(ABC):
         pass
 
 
+class EventRouter:
+
+    def __init__(self):
+        self.__listeners: Dict[str, EventListener] = dict()
+        self.__broadcast: Tuple[EventListener, ...] = ()
+
+    def register(self, listener: EventListener):
+        # registering the same listener id again replaces the former listener
+        self.__listeners[listener.id()] = listener
+        self.__broadcast = tuple(self.__listeners.values())
+
+    def unregister(self, listener: EventListener):
+        if self.__listeners.pop(listener.id(), None) is not None:
+            self.__broadcast = tuple(self.__listeners.values())
+
+    def reset(self, listeners):
+        self.__listeners = {listener.id(): listener for listener in listeners}
+        self.__broadcast = tuple(self.__listeners.values())
+
+    @property
+    def listeners(self) -> Tuple[EventListener, ...]:
+        return self.__broadcast
+
+    def get(self, listener_id: str) -> Optional[EventListener]:
+        return self.__listeners.get(listener_id, None)
+
+    def route(self, event) -> Tuple[EventListener, ...]:
+        # events without id are broadcast to all listeners
+        if event is None or event.id is None:
+            return self.__broadcast
+        listener = self.__listeners.get(event.id, None)
+        return () if listener is None else (listener,)
+
+
+class EventGapTracker:
+
+    # Home Connect event ids are appliance ids, not stream positions. Resuming by Last-Event-ID is disabled by default
+
+    def __init__(self, short_gap_sec: float = 60, active_window_sec: float = 15*60, resume_supported: bool = False):
+        self.short_gap_sec = short_gap_sec
+        self.active_window_sec = active_window_sec
+        self.resume_supported = resume_supported
+        self.__lock = Lock()
+        self.__last_event_time: Dict[str, float] = dict()
+        self.last_event_id: Optional[str] = None
+        self.__closed_time: Optional[float] = None
+        self.last_gap_sec: Optional[float] = None
+        self.num_full_reloads = 0
+        self.num_short_gap_reloads = 0
+        self.num_reloaded = 0
+        self.num_deferred = 0
+
+    def on_event(self, event):
+        if event.id is not None:
+            self.last_event_id = event.id
+            self.__last_event_time[event.id] = monotonic()
+
+    def on_stream_opened(self):
+        with self.__lock:
+            self.last_gap_sec = None if self.__closed_time is None else monotonic() - self.__closed_time
+
+    def on_stream_closed(self):
+        with self.__lock:
+            self.__closed_time = monotonic()
+
+    def last_event_time(self, haid: str) -> Optional[float]:
+        return self.__last_event_time.get(haid, None)
+
+    def select(self, listeners: Tuple[EventListener, ...]) -> Tuple[Tuple[EventListener, ...], Tuple[EventListener, ...]]:
+        # returns the listeners to reload immediately, which state could have been changed while the stream was disconnected,
+        # and the listeners which may be reloaded later. Idle appliances could have been changed as well (e.g. started by hand)
+        with self.__lock:
+            if self.last_gap_sec is None or self.last_gap_sec > self.short_gap_sec:
+                # first connect or long outage
+                self.num_full_reloads += 1
+                self.num_reloaded += len(listeners)
+                return listeners, ()
+            # short outage: only appliances which have been active recently are likely to have missed changes
+            active_since = self.__closed_time - self.active_window_sec
+            is_active = [self.__last_event_time.get(listener.id(), active_since - 1) >= active_since for listener in listeners]
+            active = tuple(listener for listener, recently in zip(listeners, is_active) if recently)
+            idle = tuple(listener for listener, recently in zip(listeners, is_active) if not recently)
+            self.num_short_gap_reloads += 1
+            self.num_reloaded += len(active)
+            self.num_deferred += len(idle)
+            return active, idle
+
+    def statistics(self) -> Dict[str, Any]:
+        return {"last_gap_sec": None if self.last_gap_sec is None else round(self.last_gap_sec, 3),
+                "full_reloads": self.num_full_reloads,
+                "short_gap_reloads": self.num_short_gap_reloads,
+                "reloaded": self.num_reloaded,
+                "deferred": self.num_deferred}
+
+
+class EventQueue:
+
+    BLOCK = "block"
+    DROP_OLDEST = "drop_oldest"
+    DROP_NEWEST = "drop_newest"
+
+    # connection state changes will never be dropped
+    CONTROL_EVENTS = ["on_connected", "on_disconnected"]
+
+    def __init__(self, notify_listener, max_size: int = 1000, overflow_policy: str = BLOCK):
+        self.notify_listener = notify_listener
+        self.max_size = max_size
+        self.overflow_policy = overflow_policy
+        self.__queue = deque()
+        self.__condition = Condition()
+        self.num_enqueued = 0
+        self.num_dispatched = 0
+        self.num_dropped = 0
+        self.max_depth = 0
+        self.last_age_sec = 0.0
+        self.max_age_sec = 0.0
+        self.__total_age_sec = 0.0
+        self.__is_dispatching = False
+        self.__is_closed = False
+        self.timings = None   # e.g. the stage timings of a replay. Gets the queueing time of each event
+        Thread(target=self.__dispatch, daemon=True).start()
+
+    def on_connected(self, event):
+        self.__enqueue("on_connected", event)
+
+    def on_disconnected(self, event):
+        self.__enqueue("on_disconnected", event)
+
+    def on_keep_alive_event(self, event):
+        self.__enqueue("on_keep_alive_event", event)
+
+    def on_notify_event(self, event):
+        self.__enqueue("on_notify_event", event)
+
+    def on_status_event(self, event):
+        self.__enqueue("on_status_event", event)
+
+    def on_event_event(self, event):
+        self.__enqueue("on_event_event", event)
+
+    @property
+    def depth(self) -> int:
+        return len(self.__queue)
+
+    def close(self, timeout_sec: float = 30):
+        # events enqueued later are discarded. Waits until the pending events have been dispatched
+        deadline = monotonic() + timeout_sec
+        with self.__condition:
+            self.__is_closed = True
+            while (len(self.__queue) > 0 or self.__is_dispatching) and monotonic() < deadline:
+                self.__condition.wait(deadline - monotonic())
+
+    def __enqueue(self, handler: str, event):
+        with self.__condition:
+            if self.__is_closed:
+                self.num_dropped += 1
+                return
+            if len(self.__queue) >= self.max_size and handler not in self.CONTROL_EVENTS:
+                if self.overflow_policy == self.DROP_NEWEST:
+                    self.num_dropped += 1
+                    return
+                elif self.overflow_policy == self.DROP_OLDEST and self.__drop_oldest():
+                    self.num_dropped += 1
+                else:
+                    # blocks also, if only connection state changes are queued
+                    while len(self.__queue) >= self.max_size:
+                        self.__condition.wait()
+            self.__queue.append((handler, event, monotonic()))
+            self.num_enqueued += 1
+            self.max_depth = max(self.max_depth, len(self.__queue))
+            self.__condition.notify_all()
+
+    def __drop_oldest(self) -> bool:
+        # removes the oldest entry, which is not a connection state change
+        for index, (handler, event, enqueue_time) in enumerate(self.__queue):
+            if handler not in self.CONTROL_EVENTS:
+                del self.__queue[index]
+                return True
+        return False
+
+    # will be called by a background thread
+    def __dispatch(self):
+        while True:
+            with self.__condition:
+                while len(self.__queue) == 0:
+                    self.__condition.wait()
+                handler, event, enqueue_time = self.__queue.popleft()
+                self.__is_dispatching = True
+                self.__condition.notify_all()
+            age_sec = monotonic() - enqueue_time
+            if self.timings is not None:
+                self.timings.add("queue", age_sec)
+            try:
+                getattr(self.notify_listener, handler)(event)
+            except Exception as e:
+                logging.warning("error occurred dispatching " + handler + " " + str(event) + " " + str(e))
+            finally:
+                with self.__condition:
+                    self.__is_dispatching = False
+                    self.__condition.notify_all()
+            self.num_dispatched += 1
+            self.last_age_sec = age_sec
+            self.max_age_sec = max(self.max_age_sec, age_sec)
+            self.__total_age_sec += age_sec
+
+    def statistics(self) -> Dict[str, Any]:
+        return {"depth": self.depth,
+                "max_depth": self.max_depth,
+                "enqueued": self.num_enqueued,
+                "dispatched": self.num_dispatched,
+                "dropped": self.num_dropped,
+                "last_age_sec": round(self.last_age_sec, 3),
+                "max_age_sec": round(self.max_age_sec, 3),
+                "avg_age_sec": round(self.__total_age_sec / self.num_dispatched, 3) if self.num_dispatched > 0 else 0}
+
+
 class ReconnectingEventStream:
 
     def __init__(self,
@@ -42,12 +263,18 @@ class ReconnectingEventStream:
                  auth: Auth,
                  notify_listener,
                  read_timeout_sec: int,
-                 max_lifetime_sec:int):
+                 max_lifetime_sec:int,
+                 gap_tracker: EventGapTracker = None,
+                 policy: ReconnectPolicy = None,
+                 timers: TimerScheduler = None):
         self.uri = uri
         self.auth = auth
         self.read_timeout_sec = read_timeout_sec
         self.max_lifetime_sec = max_lifetime_sec
         self.notify_listener = notify_listener
+        self.gap_tracker = gap_tracker
+        self.policy = ReconnectPolicy(probe=tcp_probe(uri)) if policy is None else policy
+        self.timers = shared_scheduler() if timers is None else timers
         self.stream = None
         self.is_running = True
 
@@ -55,40 +282,39 @@ class ReconnectingEventStream:
         if reason is not None:
             logging.info("terminating reconnecting event stream " + reason)
         self.is_running = False
-        self.stream.close()
+        if self.stream is not None:
+            self.stream.close()
 
     def consume(self):
-        num_trials = 0
         while self.is_running:
             try:
-                num_trials += 1
-                self.stream = EventStream(self.uri, self.auth, self.notify_listener, self.read_timeout_sec, self.max_lifetime_sec)
-                EventStreamWatchDog(self.stream, int(self.max_lifetime_sec * 1.1)).start()
-                self.stream.consume()
-                num_trials = 0
+                self.stream = EventStream(self.uri, self.auth, self.notify_listener, self.read_timeout_sec, self.max_lifetime_sec, self.gap_tracker, self.policy)
+                watchdog = EventStreamWatchDog(self.stream, int(self.max_lifetime_sec * 1.1), self.timers)
+                watchdog.start()
+                try:
+                    self.stream.consume()
+                finally:
+                    watchdog.cancel()
             except Exception as e:
+                if not self.is_running:
+                    return
                 logging.warning("error has been occurred for event stream " + self.uri + " " + str(e))
-                if num_trials < 3:
-                    wait_time_sec = 10
-                elif num_trials < 5:
-                    wait_time_sec = 60
-                elif num_trials < 10:
-                    wait_time_sec = 15*60
-                else:
-                    wait_time_sec = 60*60
-                logging.info("try reconnect in " + print_duration(wait_time_sec) + " sec...")
-                sleep(wait_time_sec)
+                classification, wait_time_sec = self.policy.on_failure(e)
+                logging.info("try reconnect in " + print_duration(int(wait_time_sec)) + " sec (" + classification + ")...")
+                self.policy.wait(classification, wait_time_sec)
                 logging.info("reconnecting")
 
 
 class EventStream:
 
-    def __init__(self, uri: str, auth: Auth, notify_listener, read_timeout_sec: int, max_lifetime_sec:int):
+    def __init__(self, uri: str, auth: Auth, notify_listener, read_timeout_sec: int, max_lifetime_sec:int, gap_tracker: EventGapTracker = None, policy: ReconnectPolicy = None):
         self.uri = uri
         self.auth = auth
         self.read_timeout_sec = read_timeout_sec
         self.max_lifetime_sec = max_lifetime_sec
         self.notify_listener = notify_listener
+        self.gap_tracker = gap_tracker
+        self.policy = policy
         self.stream = None
 
     def close(self, reason: str = None):
@@ -101,60 +327,82 @@ class EventStream:
                 pass
         self.stream = None
 
+    def __dispatch_table(self) -> Dict[str, Any]:
+        return {"NOTIFY": self.notify_listener.on_notify_event,
+                "KEEP-ALIVE": self.notify_listener.on_keep_alive_event,
+                "STATUS": self.notify_listener.on_status_event,
+                "EVENT": self.notify_listener.on_event_event,
+                "CONNECTED": self.__on_device_connected,
+                "DISCONNECTED": self.__on_device_disconnected}
+
+    def __on_device_connected(self, event):
+        logging.info("device reconnected " + str(event))
+        self.notify_listener.on_connected(event)
+
+    def __on_device_disconnected(self, event):
+        logging.info("device disconnected " + str(event))
+        self.notify_listener.on_disconnected(event)
+
     def consume(self):
         connect_time = datetime.now()
+        deadline = monotonic() + self.max_lifetime_sec
         self.stream = None
+        opened = False
         try:
             logging.info("opening event stream connection " + self.uri + " (read timeout: " + print_duration(self.read_timeout_sec) + ", life timeout: " + print_duration(self.max_lifetime_sec) + ")")
-            self.response = requests.get(self.uri,
-                                         stream=True,
-                                         timeout=self.read_timeout_sec,
-                                         headers={'Accept': 'text/event-stream', "Authorization": "Bearer " + self.auth.access_token})
+            headers = {'Accept': 'text/event-stream', "Authorization": "Bearer " + self.auth.access_token}
+            if self.gap_tracker is not None and self.gap_tracker.resume_supported and self.gap_tracker.last_event_id is not None:
+                headers['Last-Event-ID'] = self.gap_tracker.last_event_id
+            self.response = self.auth.session.get(self.uri,
+                                                  stream=True,
+                                                  timeout=self.read_timeout_sec,
+                                                  headers=headers)
 
             if 200 <= self.response.status_code <= 299:
-                self.stream = sseclient.SSEClient(self.response)
+                self.stream = self.response
+                opened = True
+                if self.gap_tracker is not None:
+                    self.gap_tracker.on_stream_opened()
+                if self.policy is not None:
+                    self.policy.on_stream_opened()
                 self.notify_listener.on_connected(None)
 
                 logging.info("consuming events...")
+                dispatch_table = self.__dispatch_table()
                 try:
-                    for event in self.stream.events():
-                        next_reconnect_date = connect_time + timedelta(seconds=self.max_lifetime_sec)
-                        remaining_secs_next_reconnect = round((next_reconnect_date - datetime.now()).total_seconds())
-                        if event.event.upper() == "NOTIFY":
-                            self.notify_listener.on_notify_event(event)
-                        elif event.event.upper() == "KEEP-ALIVE":
-                            self.notify_listener.on_keep_alive_event(event)
-                        elif event.event.upper() == "STATUS":
-                            self.notify_listener.on_status_event(event)
-                        elif event.event.upper() == "EVENT":
-                            self.notify_listener.on_event_event(event)
-                        elif event.event.upper() == "CONNECTED":
-                            logging.info("device reconnected " + str(event))
-                            self.notify_listener.on_connected(event)
-                        elif event.event.upper() == "DISCONNECTED":
-                            logging.info("device disconnected " + str(event))
-                            self.notify_listener.on_disconnected(event)
-                        else:
+                    for event in iter_events(self.response, recorder=self.auth.session.recorder):
+                        if self.gap_tracker is not None:
+                            self.gap_tracker.on_event(event)
+                        handler = dispatch_table.get(event.event, None)
+                        if handler is None:
+                            handler = dispatch_table.get(event.event.upper(), None)
+                        if handler is None:
                             logging.info("unknown event type " + str(event.event))
+                        else:
+                            handler(event)
 
-                        if remaining_secs_next_reconnect <= 0:
+                        if monotonic() > deadline:
                             self.close("Max lifetime " + print_duration(self.max_lifetime_sec) + " reached (periodic reconnect)")
 
                         if self.stream is None:
                             return
                 except Exception as e:
                     #traceback.print_exc()
-                    if datetime.now() > (connect_time + timedelta(seconds=self.max_lifetime_sec)):
+                    if monotonic() > deadline:
                         self.close("Max lifetime " + print_duration(self.max_lifetime_sec) + " reached (periodic reconnect)")
                     else:
                         raise e
             else:
                 if self.response.headers.get('Content-Type', 'text/event-stream').lower() == 'text/event-stream':
-                    raise Exception("opening event stream returns " + str(self.response.status_code))
+                    raise StreamOpenException(self.response.status_code, "opening event stream returns " + str(self.response.status_code))
                 else:
-                    raise Exception("opening event stream returns " + str(self.response.status_code) + " " + self.response.text)
+                    raise StreamOpenException(self.response.status_code, "opening event stream returns " + str(self.response.status_code) + " " + self.response.text)
         finally:
             try:
+                if opened and self.gap_tracker is not None:
+                    self.gap_tracker.on_stream_closed()
+                if opened and self.policy is not None:
+                    self.policy.on_stream_closed()
                 self.close()
                 logging.info("event stream closed (elapsed: " + print_duration(int((datetime.now()-connect_time).total_seconds())) + ")")
             finally:
@@ -164,13 +412,20 @@ class EventStream:
 
 class EventStreamWatchDog:
 
-    def __init__(self, event_stream: EventStream, max_lifetime_sec:int):
+    def __init__(self, event_stream: EventStream, max_lifetime_sec:int, timers: TimerScheduler = None):
         self.event_stream = event_stream
         self.max_lifetime_sec = max_lifetime_sec
+        self.timers = shared_scheduler() if timers is None else timers
+        self.__timer: Optional[Timer] = None
 
     def start(self):
-        Thread(target=self.watch, daemon=True).start()
+        self.__timer = self.timers.schedule(self.max_lifetime_sec, self.watch, name="event stream watchdog")
+
+    def cancel(self):
+        # releases the event stream, once it has been closed regularly
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
 
     def watch(self):
-        sleep(self.max_lifetime_sec)
         self.event_stream.close("by watchdog (life time " + print_duration(self.max_lifetime_sec) + " exceeded)")
@@ -0,0 +1,68 @@
+import logging
+from time import monotonic
+from threading import Lock
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Any
+
+
+
+class ShardedExecutor:
+
+    def __init__(self, max_workers: int = 8, thread_name_prefix: str = "shard"):
+        self.__executor = ThreadPoolExecutor(max_workers=max(1, max_workers), thread_name_prefix=thread_name_prefix)
+        self.__lock = Lock()
+        self.__shards: Dict[str, deque] = dict()
+        self.__running = set()
+        self.__last_lag_sec: Dict[str, float] = dict()
+        self.__is_shutdown = False
+        self.num_rejected = 0
+        self.timings = None   # e.g. the stage timings of a replay. Gets the lag and the run time of each task
+
+    def submit(self, shard: str, fn: Callable, *args):
+        # tasks of the same shard are executed strictly in order. Different shards are executed in parallel
+        with self.__lock:
+            if self.__is_shutdown:
+                self.num_rejected += 1
+                logging.debug("executor is shut down. Rejecting task of " + shard)
+                return
+            self.__shards.setdefault(shard, deque()).append((fn, args, monotonic()))
+            if shard in self.__running:
+                return
+            self.__running.add(shard)
+        self.__executor.submit(self.__drain, shard)
+
+    def __drain(self, shard: str):
+        while True:
+            with self.__lock:
+                tasks = self.__shards[shard]
+                if len(tasks) == 0:
+                    self.__running.discard(shard)
+                    return
+                fn, args, submit_time = tasks.popleft()
+            start = monotonic()
+            self.__last_lag_sec[shard] = start - submit_time
+            try:
+                fn(*args)
+            except Exception as e:
+                logging.warning("error occurred executing task of " + shard + " " + str(e))
+            if self.timings is not None:
+                self.timings.add("executor", start - submit_time)
+                self.timings.add("handler", monotonic() - start)
+
+    def lag(self) -> Dict[str, float]:
+        # per shard: the age of the oldest pending task, or the queueing time of the latest executed task
+        now = monotonic()
+        with self.__lock:
+            return {shard: round((now - tasks[0][2]) if len(tasks) > 0 else self.__last_lag_sec.get(shard, 0), 3) for shard, tasks in self.__shards.items()}
+
+    def statistics(self) -> Dict[str, Any]:
+        with self.__lock:
+            pending = {shard: len(tasks) for shard, tasks in self.__shards.items()}
+        return {"pending": pending, "lag_sec": self.lag(), "rejected": self.num_rejected}
+
+    def shutdown(self, wait: bool = False):
+        # with wait, the pending tasks of all shards are executed before returning
+        with self.__lock:
+            self.__is_shutdown = True
+        self.__executor.shutdown(wait=wait)
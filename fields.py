@@ -0,0 +1,99 @@
+import logging
+from operator import attrgetter
+from typing import Callable, List, Dict, Tuple, Any, Optional
+
+
+
+def enum_value(raw: str) -> str:
+    # e.g. BSH.Common.EnumType.DoorState.Closed -> Closed
+    if raw is not None and len(raw) > 0:
+        return raw[raw.rindex('.') + 1:]
+    else:
+        return ""
+
+
+class Field:
+
+    # declares an appliance field once: the Home Connect key it is updated by, its default, the transform
+    # of the raw value and the webthing metadata. Handlers, properties and the change push are generated from it
+
+    def __init__(self,
+                 name: str,
+                 key: Optional[str] = None,
+                 default: Any = "",
+                 type: str = "string",
+                 title: str = None,
+                 description: str = None,
+                 transform: Callable[[Any], Any] = None,
+                 attribute: str = None,
+                 property: str = None,
+                 exposed: bool = True,
+                 writable: bool = False,
+                 constant: bool = False,
+                 skip_missing: bool = False):
+        self.name = name                  # the (public) appliance attribute read by the webthing layer
+        self.key = key                    # None for fields which are not updated by Home Connect changes
+        self.default = default
+        self.type = type
+        self.transform = transform
+        # the raw value is stored separately, if it is transformed on read
+        self.attribute = attribute if attribute is not None else ("_" + name if transform is not None else name)
+        self.property = property if property is not None else name
+        self.exposed = exposed
+        self.writable = writable
+        self.constant = constant          # constant fields are not pushed on changes
+        self.skip_missing = skip_missing  # changes without value (e.g. constraints only) do not reset the field
+        # the value read depends on the raw value of the field only. Otherwise it is derived (e.g. the state)
+        self.is_raw = key is not None and (transform is not None or self.attribute == name)
+        self.label = name.replace('_', ' ')
+        self.metadata = {'title': title if title is not None else self.property,
+                         'type': type,
+                         'description': description if description is not None else self.label,
+                         'readOnly': not writable}
+        self.read = attrgetter(name)
+        self.handle: Optional[Callable] = None   # generated by the declaring appliance class
+
+    def handler(self, owner: type) -> Callable:
+        attribute = self.attribute
+        default = self.default
+        label = self.label
+
+        if self.skip_missing:
+            def handle(appliance, change: Dict[str, Any], source: str):
+                value = change.get('value', None)
+                if value is not None:
+                    setattr(appliance, attribute, value)
+                    logging.info("%s field '%s': %s (%s)", appliance.name, label, value, source)
+        else:
+            def handle(appliance, change: Dict[str, Any], source: str):
+                value = change.get('value', default)
+                setattr(appliance, attribute, value)
+                logging.info("%s field '%s': %s (%s)", appliance.name, label, value, source)
+        handle.__qualname__ = owner.__name__ + "._on_" + self.name
+        return handle
+
+    def accessor(self) -> property:
+        # read-only property of the transformed value
+        raw = attrgetter(self.attribute)
+        transform = self.transform
+        return property(lambda appliance: transform(raw(appliance)))
+
+    def __str__(self):
+        return self.name + " (" + str(self.key) + ")"
+
+    def __repr__(self):
+        return self.__str__()
+
+
+def merge_fields(classes: List[type]) -> List[Field]:
+    # fields of subclasses replace the fields of their base classes with the same name
+    fields: Dict[str, Field] = dict()
+    for clazz in classes:
+        for field in vars(clazz).get('FIELDS', ()):
+            fields[field.name] = field
+    return list(fields.values())
+
+
+def field_slots(fields: List[Field], *attributes: str) -> Tuple[str, ...]:
+    # fixed layout of a class: the values of the fields updated by Home Connect changes, followed by the other instance attributes
+    return tuple(field.attribute for field in fields if field.key is not None) + attributes
@@ -1,22 +1,29 @@
 import logging
-import requests
+from os import path
 from time import sleep
 from threading import Thread
-from typing import List, Optional
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, Optional
 from auth import Auth
-from eventstream import EventListener, ReconnectingEventStream
+from session import HttpSession
+from eventstream import EventListener, EventRouter, EventQueue, EventGapTracker, ReconnectingEventStream
 from appliances import Appliance, Dishwasher, Dryer, Washer
+from executor import ShardedExecutor
+from reconnect import ReconnectPolicy, tcp_probe
+from timer import TimerScheduler, shared_scheduler
+from refresh import RefreshScheduler
+from coalesce import EventCoalescer
 from utils import is_success
 
 
 
-def create_appliance(uri: str, auth: Auth, name: str, device_type: str, haid: str, brand: str, vib: str, enumber: str, directory: str) -> Optional[Appliance]:
+def create_appliance(uri: str, auth: Auth, name: str, device_type: str, haid: str, brand: str, vib: str, enumber: str, directory: str, hydrate: bool = True) -> Optional[Appliance]:
     if device_type.lower() == Dishwasher.DeviceType:
-        return Dishwasher(uri, auth, name, device_type, haid, brand, vib, enumber, directory)
+        return Dishwasher(uri, auth, name, device_type, haid, brand, vib, enumber, directory, hydrate)
     if device_type.lower() == Washer.DeviceType:
-        return Washer(uri, auth, name, device_type, haid, brand, vib, enumber, directory)
+        return Washer(uri, auth, name, device_type, haid, brand, vib, enumber, directory, hydrate)
     elif device_type.lower() == Dryer.DeviceType:
-        return Dryer(uri, auth, name, device_type, haid, brand, vib, enumber, directory)
+        return Dryer(uri, auth, name, device_type, haid, brand, vib, enumber, directory, hydrate)
     else:
         logging.warning("unknown device type " + device_type + " ignoring it")
         return None
@@ -27,83 +34,207 @@ class HomeConnect:
 
     API_URI = "https://api.home-connect.com/api"
 
-    def __init__(self, refresh_token: str, client_secret: str, directory: str):
+    def __init__(self, refresh_token: str, client_secret: str, directory: str, session: HttpSession = None, max_concurrency: int = 8, lazy: bool = False, snapshot_period_sec: int = 10*60,
+                 event_queue_size: int = 1000, event_overflow_policy: str = EventQueue.BLOCK, event_workers: int = 8,
+                 recorder=None, consume_events: bool = True, reconnect_policy: ReconnectPolicy = None, timers: TimerScheduler = None,
+                 event_batch_window_sec: float = 0.05, state_flush_period_sec: float = 1):
         self.directory = directory
-        self.notify_listeners: List[EventListener] = list()
-        self.auth = Auth(refresh_token, client_secret)
+        self.max_concurrency = max_concurrency
+        self.lazy = lazy
+        self.snapshot_period_sec = snapshot_period_sec
+        self.router = EventRouter()
+        # the event stream reader only enqueues events. Handlers run on the dispatcher thread of the queue
+        self.event_queue = EventQueue(self, event_queue_size, event_overflow_policy)
+        # events are handled in order per appliance, but different appliances are handled in parallel
+        self.event_executor = ShardedExecutor(event_workers, thread_name_prefix="appliance")
+        # after a reconnect only the appliances which could have missed changes will be reloaded
+        self.gap_tracker = EventGapTracker()
+        self.reconnect_policy = ReconnectPolicy(probe=tcp_probe(HomeConnect.API_URI)) if reconnect_policy is None else reconnect_policy
+        # a single timer thread serves the auth refresh, the event stream watchdog and the periodic reload
+        self.timers = shared_scheduler() if timers is None else timers
+        self.auth = Auth(refresh_token, client_secret, session, token_filename=path.join(directory, Auth.DEFAULT_TOKEN_FILENAME), timers=self.timers)
         self.appliances: List[Appliance] = []
+        # periodic reconciliation is spread over the refresh interval and adapted to the remaining request budget
+        self.refresh_scheduler = RefreshScheduler(self.__submit_refresh, self.auth.session.scheduler, self.gap_tracker.last_event_time)
+        # bursts of NOTIFY/STATUS events are applied as one change per appliance. A window of 0 disables coalescing
+        self.coalescer = EventCoalescer(event_batch_window_sec, self.__submit_changes, self.timers.schedule) if event_batch_window_sec > 0 else None
+        if recorder is not None:
+            self.auth.session.recorder = recorder
         self.refresh_devices()
-        Thread(target=self.__start_consuming_events, daemon=True).start()
+        self.__event_stream: Optional[ReconnectingEventStream] = None
+        if consume_events:
+            self.__event_stream = ReconnectingEventStream(HomeConnect.API_URI + "/homeappliances/events",
+                                                          self.auth,
+                                                          self.event_queue,
+                                                          read_timeout_sec=3*60,
+                                                          max_lifetime_sec=7*60*60,
+                                                          gap_tracker=self.gap_tracker,
+                                                          policy=self.reconnect_policy,
+                                                          timers=self.timers)
+            Thread(target=self.__start_consuming_events, daemon=True).start()
+        self.refresh_scheduler.start(self.timers)
+        # state transitions are persisted shortly after they occurred
+        self.__state_flush_timer = self.timers.schedule_periodically(state_flush_period_sec, self.__flush_states, name="state flush")
+        self.__snapshot_timer = self.timers.schedule_periodically(snapshot_period_sec, self.__store_snapshots, name="snapshot store")
+
+    def write(self, appliance: Appliance, name: str, value: Any):
+        setattr(appliance, name, value)
+
+    def store_snapshots(self):
+        for appliance in self.appliances:
+            appliance.store_snapshot()
+
+    def close(self):
+        # the pipeline is drained in order: stream -> queue -> coalescer -> executor. The state is complete afterwards
+        self.refresh_scheduler.stop()
+        self.__state_flush_timer.cancel()
+        self.__snapshot_timer.cancel()
+        if self.__event_stream is not None:
+            self.__event_stream.close("closed")
+        self.event_queue.close()
+        if self.coalescer is not None:
+            self.coalescer.flush_all()
+        self.event_executor.shutdown(wait=True)
+        self.store_snapshots()
+        if self.auth.session.recorder is not None:
+            self.auth.session.recorder.record_state(self.appliances)
+            self.auth.session.recorder.close()
+        self.auth.session.close()
 
     def refresh_devices(self):
+        # in lazy mode appliances will be created without loading status/settings. Hydrating takes place in background
         uri = HomeConnect.API_URI + "/homeappliances"
         logging.info("requesting " + uri)
-        response = requests.get(uri, headers={"Authorization": "Bearer " + self.auth.access_token}, timeout=5000)
+        response = self.auth.session.get(uri, headers={"Authorization": "Bearer " + self.auth.access_token})
         if is_success(response.status_code):
             data = response.json()
-            fetch_appliances = list()
-            for homeappliances in data['data']['homeappliances']:
-                appliances = create_appliance(HomeConnect.API_URI + "/homeappliances/" + homeappliances['haId'],
-                                              self.auth,
-                                              homeappliances['name'],
-                                              homeappliances['type'],
-                                              homeappliances['haId'],
-                                              homeappliances['brand'],
-                                              homeappliances['vib'],
-                                              homeappliances['enumber'],
-                                              self.directory)
-                if appliances is None:
-                    logging.warning("unsupported device type: " + homeappliances['type'] + " (" + homeappliances['haId'] + "). Ignoring it")
-                else:
-                    self.notify_listeners.append(appliances)
-                    fetch_appliances.append(appliances)
+            homeappliances_list = data['data']['homeappliances']
+            with ThreadPoolExecutor(max_workers=max(1, self.max_concurrency), thread_name_prefix="hydrate") as executor:
+                futures = [executor.submit(self.__create_appliance, homeappliances) for homeappliances in homeappliances_list]
+            fetch_appliances = [appliance for appliance in [future.result() for future in futures] if appliance is not None]
+            self.router.reset(fetch_appliances)
+            self.refresh_scheduler.set_appliances(fetch_appliances)
             self.appliances = fetch_appliances
+            if self.lazy:
+                self.__hydrate_appliances(fetch_appliances)
         else:
             logging.warning("error occurred by calling GET " + uri)
             logging.warning("got " + str(response.status_code) + " " + response.text)
             raise Exception("error occurred by calling GET " + uri + " Got " + str(response))
 
+    def __create_appliance(self, homeappliances) -> Optional[Appliance]:
+        try:
+            appliances = create_appliance(HomeConnect.API_URI + "/homeappliances/" + homeappliances['haId'],
+                                          self.auth,
+                                          homeappliances['name'],
+                                          homeappliances['type'],
+                                          homeappliances['haId'],
+                                          homeappliances['brand'],
+                                          homeappliances['vib'],
+                                          homeappliances['enumber'],
+                                          self.directory,
+                                          hydrate=not self.lazy)
+            if appliances is None:
+                logging.warning("unsupported device type: " + homeappliances['type'] + " (" + homeappliances['haId'] + "). Ignoring it")
+            return appliances
+        except Exception as e:
+            logging.warning("error occurred loading appliance " + str(homeappliances.get('haId', "")) + ". Ignoring it " + str(e))
+            return None
+
+    # the appliances are hydrated by the executor. Events of an appliance are handled after its hydration
+    def __hydrate_appliances(self, appliances: List[Appliance]):
+        logging.info("hydrating " + str(len(appliances)) + " appliances in background")
+        for appliance in appliances:
+            self.event_executor.submit(appliance.id(), self.__hydrate_appliance, appliance)
+
+    def __hydrate_appliance(self, appliance: Appliance):
+        try:
+            appliance.hydrate()
+        except Exception as e:
+            logging.warning("error occurred hydrating " + str(appliance) + " " + str(e))
+
+    # will be called by the timer thread. The files are written by the executor
+    def __store_snapshots(self):
+        for appliance in self.appliances:
+            self.event_executor.submit(appliance.id(), appliance.store_snapshot)
+
+    # will be called by the timer thread
+    def __flush_states(self):
+        for appliance in self.appliances:
+            if appliance.is_state_pending:
+                self.event_executor.submit(appliance.id(), appliance.flush_state)
+
+    # will be called by the timer thread or the dispatcher thread (reconnect)
+    def __submit_refresh(self, appliance: Appliance, max_age_sec: float):
+        self.event_executor.submit(appliance.id(), appliance.reload_if_outdated, max_age_sec)
+
     # will be called by a background thread
     def __start_consuming_events(self):
         sleep(5)
-        ReconnectingEventStream(HomeConnect.API_URI + "/homeappliances/events",
-                                self.auth,
-                                self,
-                                read_timeout_sec=3*60,
-                                max_lifetime_sec=7*60*60).consume()
+        if self.__event_stream.is_running:
+            self.__event_stream.consume()
+
+    @property
+    def notify_listeners(self) -> List[EventListener]:
+        return list(self.router.listeners)
+
+    def __submit(self, notify_listener: EventListener, handler, event):
+        if self.coalescer is not None:
+            # pending changes have to be applied before handling later events
+            self.coalescer.flush(notify_listener.id())
+        self.event_executor.submit(notify_listener.id(), handler, event)
 
-    def __is_assigned(self, notify_listener: EventListener, event):
-        return event is None or event.id is None or event.id == notify_listener.id()
+    # will be called by the timer thread
+    def __submit_changes(self, haid: str, changes: List):
+        notify_listener = self.router.get(haid)
+        if notify_listener is not None:
+            self.event_executor.submit(haid, notify_listener.on_changes, changes)
+
+    def __coalesce(self, event) -> bool:
+        if self.coalescer is None or event.id is None:
+            return False
+        for notify_listener in self.router.route(event):
+            self.coalescer.add(notify_listener.id(), event)
+        return True
 
     def on_connected(self, event):
-        for notify_listener in self.notify_listeners:
-            if self.__is_assigned(notify_listener, event):
-                notify_listener.on_connected(event)
+        if event is None:
+            # (re)connect of the event stream. The reloads are submitted by the refresh scheduler within the request budget:
+            # the appliances which could have missed changes immediately, the idle ones spread over the catch-up period
+            active, idle = self.gap_tracker.select(self.router.listeners)
+            logging.info("event stream (re)connected. Reloading " + str(len(active)) + " appliances (" + str(len(idle)) + " later)")
+            self.refresh_scheduler.request(active)
+            self.refresh_scheduler.request(idle, self.refresh_scheduler.catch_up_sec)
+            self.refresh_scheduler.tick()
+        else:
+            for notify_listener in self.router.route(event):
+                self.__submit(notify_listener, notify_listener.on_connected, event)
 
     def on_disconnected(self, event):
-        for notify_listener in self.notify_listeners:
-            if self.__is_assigned(notify_listener, event):
-                notify_listener.on_disconnected(event)
+        for notify_listener in self.router.route(event):
+            self.__submit(notify_listener, notify_listener.on_disconnected, event)
 
     def on_keep_alive_event(self, event):
-        for notify_listener in self.notify_listeners:
-            if self.__is_assigned(notify_listener, event):
-                notify_listener.on_keep_alive_event(event)
+        for notify_listener in self.router.route(event):
+            self.__submit(notify_listener, notify_listener.on_keep_alive_event, event)
 
     def on_notify_event(self, event):
-        for notify_listener in self.notify_listeners:
-            if self.__is_assigned(notify_listener, event):
-                notify_listener.on_notify_event(event)
+        if not self.__coalesce(event):
+            for notify_listener in self.router.route(event):
+                self.__submit(notify_listener, notify_listener.on_notify_event, event)
 
     def on_status_event(self, event):
-        for notify_listener in self.notify_listeners:
-            if self.__is_assigned(notify_listener, event):
-                notify_listener.on_status_event(event)
+        if not self.__coalesce(event):
+            for notify_listener in self.router.route(event):
+                self.__submit(notify_listener, notify_listener.on_status_event, event)
 
     def on_event_event(self, event):
-        for notify_listener in self.notify_listeners:
-            if self.__is_assigned(notify_listener, event):
-                notify_listener.on_event_event(event)
+        for notify_listener in self.router.route(event):
+            self.__submit(notify_listener, notify_listener.on_event_event, event)
+
+    @property
+    def event_batch_statistics(self) -> Dict[str, Any]:
+        return {} if self.coalescer is None else self.coalescer.statistics()
 
     def dishwashers(self) -> List[Dishwasher]:
         return [device for device in self.appliances if isinstance(device, Dishwasher)]
@@ -0,0 +1,126 @@
+import asyncio
+import logging
+from time import monotonic, sleep
+from threading import Lock
+from email.utils import parsedate_to_datetime
+from datetime import datetime, timezone
+from typing import Dict, Any, Optional
+
+
+
+class TokenBucket:
+
+    def __init__(self, capacity: int, period_sec: float):
+        self.capacity = capacity
+        self.period_sec = period_sec
+        self.__tokens = float(capacity)
+        self.__last = monotonic()
+
+    def __refill(self, now: float):
+        self.__tokens = min(self.capacity, self.__tokens + (now - self.__last) * self.capacity / self.period_sec)
+        self.__last = now
+
+    def wait_time(self, now: float) -> float:
+        self.__refill(now)
+        if self.__tokens >= 1:
+            return 0
+        return (1 - self.__tokens) * self.period_sec / self.capacity
+
+    def take(self):
+        self.__tokens -= 1
+
+    def remaining(self, now: float) -> int:
+        self.__refill(now)
+        return int(self.__tokens)
+
+
+class RequestScheduler:
+
+    # refer https://api-docs.home-connect.com/general?#rate-limiting
+    MAX_CALLS_PER_MINUTE = 50
+    MAX_CALLS_PER_DAY = 1000
+
+    def __init__(self, calls_per_minute: int = MAX_CALLS_PER_MINUTE, calls_per_day: int = MAX_CALLS_PER_DAY, max_retries: int = 3, default_retry_after_sec: int = 60):
+        self.max_retries = max_retries
+        self.default_retry_after_sec = default_retry_after_sec
+        self.__minute_bucket = TokenBucket(calls_per_minute, 60)
+        self.__day_bucket = TokenBucket(calls_per_day, 24*60*60)
+        self.__blocked_until = 0
+        self.__lock = Lock()
+        self.num_requests = 0
+        self.num_throttled = 0
+        self.num_queued = 0
+        self.queued_time_sec = 0.0
+
+    def __reserve(self) -> float:
+        # takes a token and returns 0, or returns the time to wait before trying again
+        with self.__lock:
+            now = monotonic()
+            wait_sec = max(self.__blocked_until - now, self.__minute_bucket.wait_time(now), self.__day_bucket.wait_time(now))
+            if wait_sec <= 0:
+                self.__minute_bucket.take()
+                self.__day_bucket.take()
+                self.num_requests += 1
+            return wait_sec
+
+    def __on_queued(self, queued_sec: float):
+        with self.__lock:
+            self.num_queued += 1
+            self.queued_time_sec += queued_sec
+
+    def acquire(self):
+        start = monotonic()
+        wait_sec = self.__reserve()
+        if wait_sec > 0:
+            while wait_sec > 0:
+                sleep(wait_sec)
+                wait_sec = self.__reserve()
+            self.__on_queued(monotonic() - start)
+
+    async def acquire_async(self):
+        start = monotonic()
+        wait_sec = self.__reserve()
+        if wait_sec > 0:
+            while wait_sec > 0:
+                await asyncio.sleep(wait_sec)
+                wait_sec = self.__reserve()
+            self.__on_queued(monotonic() - start)
+
+    def on_response(self, status_code: int, headers) -> bool:
+        # returns True, if the request has been throttled
+        if status_code != 429:
+            return False
+        retry_after_sec = self.__parse_retry_after(headers.get('Retry-After', None))
+        logging.warning("request quota exceeded (429). Pausing requests for " + str(retry_after_sec) + " sec")
+        with self.__lock:
+            self.num_throttled += 1
+            self.__blocked_until = max(self.__blocked_until, monotonic() + retry_after_sec)
+        return True
+
+    def __parse_retry_after(self, retry_after: Optional[str]) -> int:
+        if retry_after is not None:
+            try:
+                return max(0, int(retry_after))
+            except ValueError:
+                try:
+                    return max(0, int((parsedate_to_datetime(retry_after) - datetime.now(timezone.utc)).total_seconds()))
+                except Exception as e:
+                    logging.warning("could not parse Retry-After " + retry_after)
+        return self.default_retry_after_sec
+
+    def statistics(self) -> Dict[str, Any]:
+        with self.__lock:
+            now = monotonic()
+            return {"requests": self.num_requests,
+                    "throttled": self.num_throttled,
+                    "queued": self.num_queued,
+                    "queued_time_sec": round(self.queued_time_sec, 1),
+                    "blocked_sec": max(0, round(self.__blocked_until - now)),
+                    "budget_minute": self.__minute_bucket.remaining(now),
+                    "budget_day": self.__day_bucket.remaining(now)}
+
+    def __str__(self):
+        return ", ".join([name + ": " + str(value) for name, value in self.statistics().items()])
+
+    def __repr__(self):
+        return self.__str__()
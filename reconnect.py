@@ -0,0 +1,186 @@
+import socket
+import random
+import asyncio
+import logging
+from time import monotonic
+from threading import Lock, Event
+from urllib.parse import urlparse
+from typing import Callable, Dict, Any, Optional
+from requests import RequestException
+
+
+
+class StreamOpenException(Exception):
+
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def tcp_probe(uri: str, timeout_sec: float = 3) -> Callable[[], bool]:
+    parsed = urlparse(uri)
+    address = (parsed.hostname, parsed.port if parsed.port is not None else (443 if parsed.scheme == "https" else 80))
+
+    def probe() -> bool:
+        try:
+            socket.create_connection(address, timeout=timeout_sec).close()
+            return True
+        except OSError:
+            return False
+    return probe
+
+
+class ReconnectPolicy:
+
+    NETWORK_ERROR = "network_error"
+    SERVER_ERROR = "server_error"
+    AUTH_ERROR = "auth_error"
+    QUOTA_ERROR = "quota_error"
+    SLOW_RETRY = [AUTH_ERROR, QUOTA_ERROR]
+
+    def __init__(self,
+                 base_delay_sec: float = 2,
+                 max_delay_sec: float = 5*60,
+                 slow_base_delay_sec: float = 60,
+                 slow_max_delay_sec: float = 60*60,
+                 probe: Callable[[], bool] = None,
+                 probe_period_sec: float = 5):
+        self.base_delay_sec = base_delay_sec
+        self.max_delay_sec = max_delay_sec
+        self.slow_base_delay_sec = slow_base_delay_sec
+        self.slow_max_delay_sec = slow_max_delay_sec
+        self.probe = probe
+        self.probe_period_sec = probe_period_sec
+        self.__wakeup = Event()
+        self.__lock = Lock()
+        self.__delay_sec = 0.0
+        self.__opened_time: Optional[float] = None
+        self.__closed_time: Optional[float] = None
+        self.num_connects = 0
+        self.num_failures = 0
+        self.num_early_wakeups = 0
+        self.last_time_to_reconnect_sec = 0.0
+        self.max_time_to_reconnect_sec = 0.0
+        self.__total_time_to_reconnect_sec = 0.0
+        self.__num_reconnects = 0
+        self.last_uptime_sec = 0.0
+        self.__total_uptime_sec = 0.0
+        self.__num_closed = 0
+        self.__failures = {classification: 0 for classification in [self.NETWORK_ERROR, self.SERVER_ERROR, self.AUTH_ERROR, self.QUOTA_ERROR]}
+
+    @staticmethod
+    def classify(e: Exception) -> str:
+        status_code = getattr(e, 'status_code', None)
+        if status_code is None and getattr(e, 'response', None) is not None:
+            status_code = e.response.status_code   # e.g. HTTPError of a failed token refresh
+        if status_code in [401, 403] or (status_code == 400 and isinstance(e, RequestException)):
+            return ReconnectPolicy.AUTH_ERROR
+        elif status_code == 429:
+            return ReconnectPolicy.QUOTA_ERROR
+        elif status_code is not None:
+            return ReconnectPolicy.SERVER_ERROR
+        else:
+            return ReconnectPolicy.NETWORK_ERROR
+
+    def on_stream_opened(self):
+        with self.__lock:
+            now = monotonic()
+            if self.__closed_time is not None:
+                time_to_reconnect_sec = now - self.__closed_time
+                self.last_time_to_reconnect_sec = time_to_reconnect_sec
+                self.max_time_to_reconnect_sec = max(self.max_time_to_reconnect_sec, time_to_reconnect_sec)
+                self.__total_time_to_reconnect_sec += time_to_reconnect_sec
+                self.__num_reconnects += 1
+            self.num_connects += 1
+            self.__opened_time = now
+            self.__closed_time = None
+            # a successfully opened connection resets the backoff
+            self.__delay_sec = 0
+
+    def on_stream_closed(self):
+        with self.__lock:
+            now = monotonic()
+            if self.__opened_time is not None:
+                self.last_uptime_sec = now - self.__opened_time
+                self.__total_uptime_sec += self.last_uptime_sec
+                self.__num_closed += 1
+            self.__opened_time = None
+            self.__closed_time = now
+
+    def on_failure(self, e: Exception) -> (str, float):
+        # returns the classification and the delay before reconnecting
+        classification = self.classify(e)
+        with self.__lock:
+            if self.__closed_time is None:
+                self.__closed_time = monotonic()   # connection has never been opened
+            self.num_failures += 1
+            self.__failures[classification] += 1
+            if classification in self.SLOW_RETRY:
+                base, cap = self.slow_base_delay_sec, self.slow_max_delay_sec
+            else:
+                base, cap = self.base_delay_sec, self.max_delay_sec
+            # decorrelated jitter
+            self.__delay_sec = min(cap, random.uniform(base, max(base, self.__delay_sec * 3)))
+            return classification, self.__delay_sec
+
+    def wake(self):
+        # e.g. called by a network change listener
+        self.__wakeup.set()
+
+    def __on_network_back(self):
+        logging.info("network is reachable again. Reconnecting early")
+        self.num_early_wakeups += 1
+
+    def wait(self, classification: str, delay_sec: float):
+        # waits the delay. Network errors end early, if the probe fails first and succeeds afterwards (network is back)
+        self.__wakeup.clear()
+        probing = classification == self.NETWORK_ERROR and self.probe is not None
+        network_down = False
+        deadline = monotonic() + delay_sec
+        while True:
+            remaining_sec = deadline - monotonic()
+            if remaining_sec <= 0:
+                return
+            if self.__wakeup.wait(min(remaining_sec, self.probe_period_sec)):
+                self.num_early_wakeups += 1
+                return
+            if probing and monotonic() < deadline:
+                if not self.probe():
+                    network_down = True
+                elif network_down:
+                    self.__on_network_back()
+                    return
+
+    async def wait_async(self, classification: str, delay_sec: float):
+        self.__wakeup.clear()
+        probing = classification == self.NETWORK_ERROR and self.probe is not None
+        network_down = False
+        loop = asyncio.get_running_loop()
+        deadline = monotonic() + delay_sec
+        while True:
+            remaining_sec = deadline - monotonic()
+            if remaining_sec <= 0:
+                return
+            await asyncio.sleep(min(remaining_sec, self.probe_period_sec))
+            if self.__wakeup.is_set():
+                self.num_early_wakeups += 1
+                return
+            if probing and monotonic() < deadline:
+                if not await loop.run_in_executor(None, self.probe):
+                    network_down = True
+                elif network_down:
+                    self.__on_network_back()
+                    return
+
+    def statistics(self) -> Dict[str, Any]:
+        with self.__lock:
+            return {"connects": self.num_connects,
+                    "failures": dict(self.__failures),
+                    "early_wakeups": self.num_early_wakeups,
+                    "connected": self.__opened_time is not None,
+                    "uptime_sec": round(monotonic() - self.__opened_time, 1) if self.__opened_time is not None else 0,
+                    "last_uptime_sec": round(self.last_uptime_sec, 1),
+                    "avg_uptime_sec": round(self.__total_uptime_sec / self.__num_closed, 1) if self.__num_closed > 0 else 0,
+                    "last_time_to_reconnect_sec": round(self.last_time_to_reconnect_sec, 3),
+                    "max_time_to_reconnect_sec": round(self.max_time_to_reconnect_sec, 3),
+                    "avg_time_to_reconnect_sec": round(self.__total_time_to_reconnect_sec / self.__num_reconnects, 3) if self.__num_reconnects > 0 else 0}
@@ -0,0 +1,232 @@
+import os
+import json
+import logging
+import tempfile
+import requests
+from time import monotonic, sleep
+from threading import Lock
+from collections import deque
+from typing import List, Dict, Any, Optional
+from session import HttpSession
+from eventstream import EventStream, EventQueue
+
+
+
+def appliance_state(appliance) -> Dict[str, Any]:
+    # the (transformed) values of the fields updated by Home Connect changes
+    state = {field.name: field.read(appliance) for field in appliance.fields() if field.key is not None}
+    state["state"] = appliance.state
+    return state
+
+
+class Recorder:
+
+    # one json record per line: {"t": <offset sec>, "k": "rest" | "sse" | "state", ...}
+
+    def __init__(self, filename: str):
+        self.filename = filename
+        self.__lock = Lock()
+        self.__start = monotonic()
+        self.__file = open(filename, "a", encoding="UTF-8")
+        logging.info("recording to " + os.path.abspath(filename))
+
+    def __append(self, record: Dict[str, Any]):
+        record["t"] = round(monotonic() - self.__start, 4)
+        line = json.dumps(record, separators=(',', ':'))
+        with self.__lock:
+            if not self.__file.closed:
+                self.__file.write(line + "\n")
+                self.__file.flush()
+
+    def record_rest(self, method: str, uri: str, response):
+        self.__append({"k": "rest", "m": method, "u": uri, "s": response.status_code, "b": response.text})
+
+    def record_sse(self, chunk: bytes):
+        # latin-1 maps each byte to one char, so chunks splitting multi-byte chars are stored lossless
+        self.__append({"k": "sse", "d": chunk.decode("ISO-8859-1")})
+
+    def record_state(self, appliances: List):
+        self.__append({"k": "state", "a": {appliance.haid: appliance_state(appliance) for appliance in appliances}})
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
+
+    @staticmethod
+    def load(filename: str) -> List[Dict[str, Any]]:
+        with open(filename, "r", encoding="UTF-8") as file:
+            return [json.loads(line) for line in file if len(line.strip()) > 0]
+
+
+class ReplayResponse:
+
+    def __init__(self, status_code: int, text: str, raw=None):
+        self.status_code = status_code
+        self.text = text
+        self.headers = {'Content-Type': 'text/event-stream' if raw is not None else 'application/json'}
+        self.raw = raw
+
+    def json(self):
+        return json.loads(self.text)
+
+    def raise_for_status(self):
+        if not 200 <= self.status_code <= 299:
+            raise requests.HTTPError(str(self.status_code) + " " + self.text, response=self)
+
+    def close(self):
+        if self.raw is not None:
+            self.raw.close()
+
+
+class ReplayStream:
+
+    chunked = True
+
+    def __init__(self, records: List[Dict[str, Any]], speed: float, timings):
+        self.records = records
+        self.speed = speed
+        self.timings = timings
+        self.is_closed = False
+
+    def read_chunked(self, decode_content: bool = True):
+        previous = None
+        for record in self.records:
+            if self.is_closed:
+                return
+            if self.speed > 0 and previous is not None:
+                delay = (record['t'] - previous) / self.speed
+                if delay > 0:
+                    sleep(delay)
+            previous = record['t']
+            self.timings.last_read_time = monotonic()
+            yield record['d'].encode("ISO-8859-1")
+
+    def close(self):
+        self.is_closed = True
+
+
+class ReplaySession(HttpSession):
+
+    def __init__(self, records: List[Dict[str, Any]], speed: float, timings):
+        super().__init__(pool_size=1)
+        self.__lock = Lock()
+        self.__responses: Dict[str, deque] = dict()
+        self.__last_responses: Dict[str, Dict[str, Any]] = dict()
+        for record in records:
+            if record['k'] == "rest":
+                self.__responses.setdefault(record['m'] + " " + record['u'], deque()).append(record)
+        self.__sse_records = [record for record in records if record['k'] == "sse"]
+        self.speed = speed
+        self.timings = timings
+
+    def request(self, method: str, uri: str, **kwargs):
+        if kwargs.get('stream', False):
+            return ReplayResponse(200, "", ReplayStream(self.__sse_records, self.speed, self.timings))
+        key = method + " " + uri
+        with self.__lock:
+            responses = self.__responses.get(key, deque())
+            # recorded responses are served in order. The last one is repeated, if exhausted
+            record = responses.popleft() if len(responses) > 0 else self.__last_responses.get(key, None)
+            if record is not None:
+                self.__last_responses[key] = record
+        if record is None:
+            if uri.endswith("/oauth/token"):
+                return ReplayResponse(200, json.dumps({"access_token": "replay", "expires_in": 24*60*60}))
+            return ReplayResponse(404, json.dumps({"error": {"key": "replay.not.recorded", "description": key}}))
+        return ReplayResponse(record['s'], record['b'])
+
+
+class StageTimings:
+
+    # parse: read to enqueue, queue: enqueue to dispatch, executor: submit to run, handler: run time of the task
+    STAGES = ["parse", "queue", "executor", "handler"]
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.last_read_time = monotonic()
+        self.__latencies: Dict[str, List[float]] = {stage: [] for stage in self.STAGES}
+        self.num_events = 0
+
+    def add(self, stage: str, latency_sec: float):
+        with self.__lock:
+            self.__latencies[stage].append(latency_sec)
+
+    def percentiles(self) -> Dict[str, Dict[str, float]]:
+        result = dict()
+        with self.__lock:
+            for stage, latencies in self.__latencies.items():
+                values = sorted(latencies)
+                if len(values) > 0:
+                    result[stage] = {name: round(values[min(len(values) - 1, int(len(values) * percentile))] * 1000, 3) for name, percentile in [("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)]}
+        return result
+
+
+class _IngestProbe:
+
+    # stands between the event stream and the event queue
+
+    def __init__(self, timings: StageTimings, event_queue: EventQueue):
+        self.timings = timings
+        self.event_queue = event_queue
+
+    def __getattr__(self, handler: str):
+        def probe(event):
+            now = monotonic()
+            if event is not None:
+                self.timings.num_events += 1
+                self.timings.add("parse", now - self.timings.last_read_time)
+            getattr(self.event_queue, handler)(event)
+        return probe
+
+
+class ReplayDriver:
+
+    def __init__(self, filename: str, speed: float = 0, event_workers: int = 8):
+        # speed: 1 = real time, N = N times faster, 0 = as fast as possible
+        self.records = Recorder.load(filename)
+        self.speed = speed
+        self.event_workers = event_workers
+
+    def run(self) -> Dict[str, Any]:
+        from homeconnect import HomeConnect
+
+        timings = StageTimings()
+        session = ReplaySession(self.records, self.speed, timings)
+        directory = tempfile.mkdtemp(prefix="homeconnect_replay_")
+        homeconnect = HomeConnect("replay", "replay", directory, session=session, consume_events=False, event_workers=self.event_workers, event_queue_size=100000)
+        homeconnect.event_queue.timings = timings
+        homeconnect.event_executor.timings = timings
+
+        # the recorded stream feeds the event queue of the client. Events pass its real pipeline: queue, router, coalescer and sharded executor
+        start = monotonic()
+        EventStream(HomeConnect.API_URI + "/homeappliances/events", homeconnect.auth, _IngestProbe(timings, homeconnect.event_queue), read_timeout_sec=60, max_lifetime_sec=365*24*60*60, gap_tracker=homeconnect.gap_tracker).consume()
+        # drains the pipeline
+        homeconnect.close()
+        elapsed_sec = monotonic() - start
+
+        return {"events": timings.num_events,
+                "elapsed_sec": round(elapsed_sec, 3),
+                "events_per_sec": round(timings.num_events / elapsed_sec, 1) if elapsed_sec > 0 else 0,
+                "latency_ms": timings.percentiles(),
+                "event_queue": homeconnect.event_queue.statistics(),
+                "event_batches": homeconnect.event_batch_statistics,
+                "state_differences": self.__compare_state(homeconnect.appliances)}
+
+    def __compare_state(self, appliances: List) -> Optional[Dict[str, Dict[str, Any]]]:
+        recorded = [record for record in self.records if record['k'] == "state"]
+        if len(recorded) == 0:
+            return None
+        expected = recorded[-1]['a']
+        differences = dict()
+        for appliance in appliances:
+            actual = appliance_state(appliance)
+            for name, value in expected.get(appliance.haid, {}).items():
+                if actual.get(name, None) != value:
+                    differences.setdefault(appliance.haid, {})[name] = {"recorded": value, "replayed": actual.get(name, None)}
+        return differences
+
+
+if __name__ == '__main__':
+    import sys
+    logging.basicConfig(format='%(asctime)s %(name)-20s: %(levelname)-8s %(message)s', level=logging.WARNING, datefmt='%Y-%m-%d %H:%M:%S')
+    print(json.dumps(ReplayDriver(sys.argv[1], float(sys.argv[2]) if len(sys.argv) > 2 else 0).run(), indent=2))
@@ -0,0 +1,142 @@
+import random
+import logging
+from time import monotonic
+from threading import Lock
+from typing import Callable, List, Dict, Set, Any, Optional
+from ratelimit import RequestScheduler
+from timer import TimerScheduler, Timer
+
+
+
+class RefreshScheduler:
+
+    # spreads the periodic reconciliation of the appliances over the refresh interval, instead of reloading all at once.
+    # Refreshes are submitted within the request budget only, so that they never wait for the request scheduler.
+    # submit(appliance, max_age_sec) reloads the appliance, if its last refresh is older than max_age_sec
+
+    def __init__(self,
+                 submit: Callable,
+                 request_scheduler: RequestScheduler = None,
+                 last_event_time: Callable[[str], Optional[float]] = None,
+                 interval_sec: float = 30*60,
+                 max_interval_sec: float = 24*60*60,
+                 quiet_sec: float = 10*60,
+                 calls_per_refresh: int = 2,
+                 budget_share: float = 0.5,
+                 jitter: float = 0.1,
+                 tick_sec: float = 10,
+                 catch_up_sec: float = 5*60):
+        self.submit = submit
+        self.request_scheduler = request_scheduler
+        self.last_event_time = last_event_time
+        self.min_interval_sec = interval_sec
+        self.max_interval_sec = max_interval_sec
+        self.quiet_sec = quiet_sec
+        self.calls_per_refresh = calls_per_refresh
+        self.budget_share = budget_share
+        self.jitter = jitter
+        self.tick_sec = tick_sec
+        self.catch_up_sec = catch_up_sec
+        self.__lock = Lock()
+        self.__appliances: Dict[str, Any] = dict()
+        self.__due: Dict[str, float] = dict()
+        self.__requested: Set[str] = set()
+        self.__timer: Optional[Timer] = None
+        self.last_interval_sec = interval_sec
+        self.num_refreshed = 0
+        self.num_skipped = 0
+        self.num_requested = 0
+        self.num_deferred = 0
+
+    def set_appliances(self, appliances: List):
+        # the first refresh of each appliance is spread evenly over the interval
+        now = monotonic()
+        with self.__lock:
+            self.__appliances = {appliance.id(): appliance for appliance in appliances}
+        interval_sec = self.interval_sec()
+        with self.__lock:
+            self.__due = {appliance.id(): self.__due.get(appliance.id(), now + interval_sec * (index + random.random()) / max(1, len(appliances)))
+                          for index, appliance in enumerate(appliances)}
+
+    def interval_sec(self) -> float:
+        # the interval is stretched, if refreshing all appliances would exceed the share of the remaining daily budget
+        if self.request_scheduler is None:
+            return self.min_interval_sec
+        remaining_day = self.request_scheduler.statistics()['budget_day']
+        calls_per_round = len(self.__appliances) * self.calls_per_refresh
+        allowed_calls_per_day = max(1.0, remaining_day * self.budget_share)
+        interval_sec = 24*60*60 * calls_per_round / allowed_calls_per_day
+        return min(self.max_interval_sec, max(self.min_interval_sec, interval_sec))
+
+    def request(self, appliances: List, within_sec: float = 0):
+        # refreshes the appliances ahead of their regular refresh regardless of their last refresh (e.g. after a reconnect).
+        # The refreshes are spread evenly within the period
+        now = monotonic()
+        with self.__lock:
+            for index, appliance in enumerate(appliances):
+                haid = appliance.id()
+                if haid in self.__appliances:
+                    self.__due[haid] = min(self.__due.get(haid, now), now + within_sec * index / max(1, len(appliances)))
+                    self.__requested.add(haid)
+                    self.num_requested += 1
+
+    def __budget(self) -> int:
+        # the number of refreshes which can be performed without waiting for the request scheduler
+        if self.request_scheduler is None:
+            return len(self.__appliances)
+        statistics = self.request_scheduler.statistics()
+        if statistics['blocked_sec'] > 0:
+            return 0
+        return min(statistics['budget_minute'], statistics['budget_day']) // self.calls_per_refresh
+
+    def __next_due(self, now: float, interval_sec: float) -> float:
+        return now + interval_sec * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def start(self, timers: TimerScheduler):
+        self.__timer = timers.schedule_periodically(self.tick_sec, self.tick, name="refresh scheduler")
+
+    def stop(self):
+        if self.__timer is not None:
+            self.__timer.cancel()
+            self.__timer = None
+
+    def tick(self):
+        now = monotonic()
+        interval_sec = self.interval_sec()
+        if abs(interval_sec - self.last_interval_sec) > 0.1 * self.last_interval_sec:
+            logging.info("refresh interval adjusted to " + str(int(interval_sec)) + " sec (" + str(len(self.__appliances)) + " appliances)")
+        self.last_interval_sec = interval_sec
+        budget = self.__budget()
+        due = []
+        with self.__lock:
+            for haid, due_time in sorted(self.__due.items(), key=lambda item: item[1]):
+                if due_time > now:
+                    break
+                if haid in self.__requested:
+                    max_age_sec = 0
+                else:
+                    last_event_time = None if self.last_event_time is None else self.last_event_time(haid)
+                    if last_event_time is not None and (now - last_event_time) < self.quiet_sec:
+                        # the appliance has sent events recently. Its state is up to date
+                        self.num_skipped += 1
+                        self.__due[haid] = self.__next_due(now, interval_sec)
+                        continue
+                    max_age_sec = self.quiet_sec
+                if len(due) >= budget:
+                    # remains due. Will be submitted by the next ticks
+                    self.num_deferred += 1
+                    continue
+                self.__requested.discard(haid)
+                self.__due[haid] = self.__next_due(now, interval_sec)
+                due.append((self.__appliances[haid], max_age_sec))
+        for appliance, max_age_sec in due:
+            self.num_refreshed += 1
+            self.submit(appliance, max_age_sec)
+
+    def statistics(self) -> Dict[str, Any]:
+        return {"appliances": len(self.__appliances),
+                "interval_sec": int(self.last_interval_sec),
+                "refreshed": self.num_refreshed,
+                "skipped": self.num_skipped,
+                "requested": self.num_requested,
+                "deferred": self.num_deferred}
@@ -0,0 +1,153 @@
+import logging
+import random
+from time import monotonic, sleep
+from threading import Lock
+from typing import Callable, Dict, Any
+from requests import Response, RequestException
+from utils import is_offline_error
+
+
+
+class CircuitOpenException(Exception):
+    pass
+
+
+class CircuitBreaker:
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout_sec: float = 60):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout_sec = reset_timeout_sec
+        self.__lock = Lock()
+        self.__state = self.CLOSED
+        self.__num_failures = 0
+        self.__opened_time = 0
+
+    @property
+    def state(self) -> str:
+        with self.__lock:
+            if self.__state == self.OPEN and (monotonic() - self.__opened_time) >= self.reset_timeout_sec:
+                return self.HALF_OPEN
+            return self.__state
+
+    def allow(self) -> bool:
+        with self.__lock:
+            if self.__state == self.CLOSED:
+                return True
+            if self.__state == self.OPEN and (monotonic() - self.__opened_time) >= self.reset_timeout_sec:
+                # let a single trial pass to probe the appliance
+                self.__state = self.HALF_OPEN
+                return True
+            return False
+
+    def on_success(self):
+        with self.__lock:
+            self.__state = self.CLOSED
+            self.__num_failures = 0
+
+    def on_failure(self, trip: bool = False):
+        with self.__lock:
+            self.__num_failures += 1
+            if trip or self.__state == self.HALF_OPEN or self.__num_failures >= self.failure_threshold:
+                if self.__state != self.OPEN:
+                    logging.info("circuit opened after " + str(self.__num_failures) + " failures")
+                self.__state = self.OPEN
+                self.__opened_time = monotonic()
+
+
+class Retrier:
+
+    SUCCESS = "success"
+    OFFLINE = "offline"
+    THROTTLED = "throttled"
+    SERVER_ERROR = "server_error"
+    NETWORK_ERROR = "network_error"
+    CLIENT_ERROR = "client_error"
+    # 429 is not retried here. The session's request scheduler already retries it honoring Retry-After
+    RETRYABLE = [SERVER_ERROR, NETWORK_ERROR]
+
+    def __init__(self, breaker: CircuitBreaker = None, base_delay_sec: float = 1, max_delay_sec: float = 30):
+        self.breaker = CircuitBreaker() if breaker is None else breaker
+        self.base_delay_sec = base_delay_sec
+        self.max_delay_sec = max_delay_sec
+        self.__lock = Lock()
+        self.__counters = {classification: 0 for classification in [self.SUCCESS, self.OFFLINE, self.THROTTLED, self.SERVER_ERROR, self.NETWORK_ERROR, self.CLIENT_ERROR]}
+        self.num_retries = 0
+        self.num_rejected = 0
+
+    @staticmethod
+    def classify(response: Response) -> str:
+        if 200 <= response.status_code <= 299:
+            return Retrier.SUCCESS
+        elif is_offline_error(response.status_code, response.text):
+            return Retrier.OFFLINE
+        elif response.status_code == 429:
+            return Retrier.THROTTLED
+        elif response.status_code >= 500:
+            return Retrier.SERVER_ERROR
+        else:
+            return Retrier.CLIENT_ERROR
+
+    def backoff_sec(self, trial: int) -> float:
+        # exponential backoff with full jitter
+        return random.uniform(0, min(self.max_delay_sec, self.base_delay_sec * (2 ** trial)))
+
+    def __count(self, classification: str):
+        with self.__lock:
+            self.__counters[classification] += 1
+
+    def execute(self, request: Callable[[], Response], max_trials: int = 3, name: str = "") -> Response:
+        if not self.breaker.allow():
+            with self.__lock:
+                self.num_rejected += 1
+            raise CircuitOpenException(name + " is unreachable (circuit " + self.breaker.state + "). Rejecting request")
+
+        trial = 0
+        while True:
+            trial += 1
+            try:
+                response = request()
+                classification = self.classify(response)
+            except RequestException as e:
+                response = None
+                classification = self.NETWORK_ERROR
+                if trial >= max_trials:
+                    self.__count(classification)
+                    self.breaker.on_failure()
+                    raise e
+            except Exception as e:
+                # e.g. a malformed token response. Otherwise a half-open circuit would never be closed or reopened
+                self.breaker.on_failure()
+                raise e
+            self.__count(classification)
+
+            if classification == self.SUCCESS:
+                self.breaker.on_success()
+                return response
+            elif classification == self.OFFLINE:
+                self.breaker.on_failure(trip=True)
+                return response
+            elif classification in self.RETRYABLE and trial < max_trials:
+                delay = self.backoff_sec(trial)
+                logging.warning(name + " got " + classification + " (" + str(trial) + ". trial). Waiting " + str(round(delay, 1)) + " sec for retry")
+                with self.__lock:
+                    self.num_retries += 1
+                sleep(delay)
+            else:
+                if classification in self.RETRYABLE:
+                    self.breaker.on_failure()
+                else:
+                    # the appliance has answered (e.g. with a validation error)
+                    self.breaker.on_success()
+                return response
+
+    def statistics(self) -> Dict[str, Any]:
+        with self.__lock:
+            statistics: Dict[str, Any] = dict(self.__counters)
+            statistics["retries"] = self.num_retries
+            statistics["rejected"] = self.num_rejected
+        statistics["circuit"] = self.breaker.state
+        return statistics
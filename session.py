@@ -0,0 +1,91 @@
+import logging
+import requests
+from threading import Lock
+from requests.adapters import HTTPAdapter
+from typing import Dict, Any
+from ratelimit import RequestScheduler
+
+
+
+class HttpSession:
+
+    def __init__(self, pool_size: int = 10, keep_alive: bool = True, timeout_sec: float = 5000, scheduler: RequestScheduler = None):
+        self.pool_size = pool_size
+        self.scheduler = scheduler
+        self.recorder = None
+        self.keep_alive = keep_alive
+        self.timeout_sec = timeout_sec
+        self.__lock = Lock()
+        self.__session = requests.Session()
+        self.__adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+        self.__session.mount("https://", self.__adapter)
+        self.__session.mount("http://", self.__adapter)
+        if not keep_alive:
+            self.__session.headers["Connection"] = "close"
+
+    def get(self, uri: str, **kwargs) -> requests.Response:
+        return self.request("GET", uri, **kwargs)
+
+    def put(self, uri: str, **kwargs) -> requests.Response:
+        return self.request("PUT", uri, **kwargs)
+
+    def post(self, uri: str, **kwargs) -> requests.Response:
+        return self.request("POST", uri, **kwargs)
+
+    def request(self, method: str, uri: str, **kwargs) -> requests.Response:
+        if kwargs.get('timeout', None) is None:
+            kwargs['timeout'] = self.timeout_sec
+        # long-living event streams are not subject to the request quota
+        if self.scheduler is None or kwargs.get('stream', False):
+            return self.__record(method, uri, self.__session.request(method, uri, **kwargs), **kwargs)
+        trial = 0
+        while True:
+            trial += 1
+            self.scheduler.acquire()
+            response = self.__record(method, uri, self.__session.request(method, uri, **kwargs), **kwargs)
+            if not self.scheduler.on_response(response.status_code, response.headers) or trial > self.scheduler.max_retries:
+                return response
+
+    def __record(self, method: str, uri: str, response: requests.Response, **kwargs) -> requests.Response:
+        # streamed responses are recorded chunk by chunk by the reader. Token responses are never recorded (credentials)
+        if self.recorder is not None and not kwargs.get('stream', False) and not uri.endswith("/oauth/token"):
+            self.recorder.record_rest(method, uri, response)
+        return response
+
+    def __pools(self):
+        with self.__lock:
+            return [self.__adapter.poolmanager.pools[key] for key in list(self.__adapter.poolmanager.pools.keys())]
+
+    @property
+    def num_connections_opened(self) -> int:
+        return sum([pool.num_connections for pool in self.__pools()])
+
+    @property
+    def num_requests(self) -> int:
+        return sum([pool.num_requests for pool in self.__pools()])
+
+    @property
+    def num_connections_reused(self) -> int:
+        return max(0, self.num_requests - self.num_connections_opened)
+
+    def statistics(self) -> Dict[str, Any]:
+        statistics = {"pool_size": self.pool_size,
+                      "keep_alive": self.keep_alive,
+                      "requests": self.num_requests,
+                      "connections_opened": self.num_connections_opened,
+                      "connections_reused": self.num_connections_reused}
+        if self.scheduler is not None:
+            statistics["scheduler"] = self.scheduler.statistics()
+        return statistics
+
+    def close(self):
+        try:
+            self.__session.close()
+        except Exception as e:
+            logging.warning("error occurred closing http session " + str(e))
+
+    def __str__(self):
+        return "requests: " + str(self.num_requests) + ", connections opened: " + str(self.num_connections_opened) + ", connections reused: " + str(self.num_connections_reused)
+
+    def __repr__(self):
+        return self.__str__()
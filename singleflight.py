@@ -0,0 +1,50 @@
+from time import monotonic
+from threading import Lock, Event
+from typing import Callable, Dict, Any
+
+
+
+class SingleFlight:
+
+    def __init__(self):
+        self.__lock = Lock()
+        self.__running = False
+        self.__done = Event()
+        self.__last_completed = None
+        self.num_executed = 0
+        self.num_joined = 0
+        self.num_fresh = 0
+
+    def run(self, fn: Callable[[], None], freshness_sec: float = 0) -> bool:
+        # returns True, if fn has been executed by the caller. Otherwise, the caller has joined a running
+        # execution or has been served by an execution completed within the freshness window
+        with self.__lock:
+            if self.__running:
+                self.num_joined += 1
+                done = self.__done
+                leader = False
+            elif self.__last_completed is not None and (monotonic() - self.__last_completed) < freshness_sec:
+                self.num_fresh += 1
+                return False
+            else:
+                self.num_executed += 1
+                self.__running = True
+                self.__done = Event()
+                done = self.__done
+                leader = True
+
+        if not leader:
+            done.wait()
+            return False
+
+        try:
+            fn()
+        finally:
+            with self.__lock:
+                self.__running = False
+                self.__last_completed = monotonic()
+            done.set()
+        return True
+
+    def statistics(self) -> Dict[str, Any]:
+        return {"executed": self.num_executed, "joined": self.num_joined, "fresh": self.num_fresh}
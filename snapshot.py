@@ -0,0 +1,56 @@
+import logging
+from datetime import datetime
+from typing import List, Dict, Any, Optional
+from redzoo.database.simple import SimpleDB
+
+
+
+class ApplianceSnapshot:
+
+    VERSION = 1
+
+    def __init__(self, haid: str, directory: str):
+        self.__db = SimpleDB(haid + '_snapshot', directory=directory)
+        self.__items: Dict[str, Dict[str, Any]] = dict()
+        self.__attributes: Dict[str, Any] = dict()
+        self.__dirty = False
+
+    def record(self, change: Dict[str, Any]):
+        key = change.get('key', None)
+        if key is not None:
+            merged = dict(self.__items.get(key, {}))
+            merged.update(change)
+            if self.__items.get(key, None) != merged:
+                self.__items[key] = merged
+                self.__dirty = True
+
+    def set_attribute(self, name: str, value: Any):
+        if self.__attributes.get(name, None) != value:
+            self.__attributes[name] = value
+            self.__dirty = True
+
+    def attribute(self, name: str, default_value: Any = None) -> Any:
+        return self.__attributes.get(name, default_value)
+
+    def load(self) -> Optional[List[Dict[str, Any]]]:
+        snapshot = self.__db.get("snapshot", {})
+        if snapshot.get("version", -1) != self.VERSION:
+            return None
+        self.__items = {item['key']: item for item in snapshot.get("items", []) if 'key' in item.keys()}
+        self.__attributes = snapshot.get("attributes", {})
+        self.__dirty = False
+        logging.info("snapshot loaded (" + str(len(self.__items)) + " items, saved " + snapshot.get("saved", "") + ")")
+        return list(self.__items.values())
+
+    def store(self):
+        if self.__dirty:
+            # cleared ahead of the put, so that changes recorded in the meantime are stored by the next call
+            self.__dirty = False
+            try:
+                self.__db.put("snapshot", {"version": self.VERSION,
+                                           "saved": datetime.now().strftime("%Y-%m-%dT%H:%M:%S"),
+                                           "items": list(self.__items.values()),
+                                           "attributes": dict(self.__attributes)})
+            except Exception as e:
+                self.__dirty = True   # retried by the next store
+                raise e
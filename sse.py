@@ -0,0 +1,100 @@
+from typing import List, Iterator, Optional
+
+
+
+class SseEvent:
+
+    def __init__(self, event: str = "message", data: str = "", id: Optional[str] = None):
+        self.event = event
+        self.data = data
+        self.id = id
+
+    def __str__(self):
+        return self.event + " " + str(self.id) + " " + self.data
+
+    def __repr__(self):
+        return self.__str__()
+
+
+class SseParser:
+
+    def __init__(self):
+        self.__buffer = bytearray()
+        self.__event = "message"
+        self.__data: List[str] = []
+        self.__id = None
+        self.__skip_lf = False
+
+    def feed(self, chunk: bytes) -> List[SseEvent]:
+        buffer = self.__buffer
+        buffer += chunk
+        events = []
+        start = 0
+        if self.__skip_lf and len(buffer) > 0:
+            # the CR ending the previous chunk has been followed by the LF of a CRLF
+            if buffer[0] == 10:
+                start = 1
+            self.__skip_lf = False
+        # lines end with CRLF, LF or CR. Values are decoded straight out of the buffer. Only the consumed lines are removed afterwards
+        cr = buffer.find(b"\r", start)
+        lf = buffer.find(b"\n", start)
+        with memoryview(buffer) as view:
+            while lf >= 0 or cr >= 0:
+                if lf < 0 or 0 <= cr < lf:
+                    line_end = cr
+                    next_start = cr + 2 if lf == cr + 1 else cr + 1
+                    # a CR at the end of the chunk completes the line. The LF of a CRLF may follow with the next chunk
+                    self.__skip_lf = next_start == len(buffer)
+                else:
+                    line_end = lf
+                    next_start = lf + 1
+                if line_end == start:
+                    # as specified, events without data lines are not dispatched
+                    if len(self.__data) > 0:
+                        events.append(SseEvent(self.__event, "\n".join(self.__data), self.__id))
+                    self.__event = "message"
+                    self.__data = []
+                    self.__id = None
+                elif buffer[start] != 58:   # lines starting with ':' are comments
+                    colon = buffer.find(b":", start, line_end)
+                    name_end = line_end if colon < 0 else colon
+                    value_start = line_end if colon < 0 else colon + 1
+                    if value_start < line_end and buffer[value_start] == 32:
+                        value_start += 1
+                    name_len = name_end - start
+                    if name_len == 4 and buffer.startswith(b"data", start):
+                        self.__data.append(str(view[value_start:line_end], "UTF-8"))
+                    elif name_len == 5 and buffer.startswith(b"event", start):
+                        self.__event = str(view[value_start:line_end], "UTF-8")
+                    elif name_len == 2 and buffer.startswith(b"id", start):
+                        self.__id = str(view[value_start:line_end], "UTF-8")
+                start = next_start
+                if 0 <= cr < start:
+                    cr = buffer.find(b"\r", start)
+                if 0 <= lf < start:
+                    lf = buffer.find(b"\n", start)
+        del buffer[:start]
+        return events
+
+
+def iter_chunks(response, chunk_size: int = 4096) -> Iterator[bytes]:
+    # hands out the data as soon as it is received, instead of waiting for a fixed block size
+    raw = response.raw
+    if getattr(raw, 'chunked', False) and hasattr(raw, 'read_chunked'):
+        yield from raw.read_chunked(decode_content=True)
+    elif hasattr(raw, 'read1'):
+        while True:
+            chunk = raw.read1(chunk_size)
+            if len(chunk) == 0:
+                return
+            yield chunk
+    else:
+        yield from response.iter_content(chunk_size=1)
+
+
+def iter_events(response, chunk_size: int = 4096, recorder=None) -> Iterator[SseEvent]:
+    parser = SseParser()
+    for chunk in iter_chunks(response, chunk_size):
+        if recorder is not None:
+            recorder.record_sse(chunk)
+        yield from parser.feed(chunk)
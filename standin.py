@@ -0,0 +1,271 @@
+import json
+import random
+import asyncio
+import logging
+import tornado.web
+import tornado.iostream
+from time import time
+from threading import Thread, Event
+from typing import List, Dict, Any, Optional
+
+
+
+OFFLINE_ERROR = {"error": {"key": "SDK.Error.HomeAppliance.Connection.Initialization.Failed", "description": "HomeAppliance is offline"}}
+
+PROGRAMS = {"Dishwasher": "Dishcare.Dishwasher.Program.Eco50",
+            "Washer": "LaundryCare.Washer.Program.Cotton",
+            "Dryer": "LaundryCare.Dryer.Program.Cotton"}
+
+
+class SimulatedAppliance:
+
+    def __init__(self, device_type: str, index: int, offline: bool):
+        self.device_type = device_type
+        self.haid = "SIM-" + device_type.upper() + "-" + str(index).zfill(4)
+        self.name = device_type + " " + str(index)
+        self.offline = offline
+        self.power = "BSH.Common.EnumType.PowerState.On"
+        self.door = "BSH.Common.EnumType.DoorState.Closed"
+        self.operation = "BSH.Common.EnumType.OperationState.Run"
+        self.program = PROGRAMS[device_type]
+        self.progress = 0
+
+    def info(self) -> Dict[str, Any]:
+        return {"haId": self.haid, "name": self.name, "type": self.device_type, "brand": "Simulated", "vib": "SIM" + self.device_type.upper(), "enumber": "SIM/" + self.device_type, "connected": not self.offline}
+
+    def status(self) -> List[Dict[str, Any]]:
+        return [{"key": "BSH.Common.Status.DoorState", "value": self.door},
+                {"key": "BSH.Common.Status.OperationState", "value": self.operation},
+                {"key": "BSH.Common.Status.RemoteControlStartAllowed", "value": True},
+                {"key": "BSH.Common.Status.RemoteControlActive", "value": True}]
+
+    def settings(self) -> List[Dict[str, Any]]:
+        return [{"key": "BSH.Common.Setting.PowerState", "value": self.power},
+                {"key": "BSH.Common.Setting.ChildLock", "value": False}]
+
+    def options(self) -> List[Dict[str, Any]]:
+        if self.device_type == "Dishwasher":
+            return [{"key": "BSH.Common.Option.StartInRelative", "value": 0, "unit": "seconds", "constraints": {"min": 0, "max": 86340, "stepsize": 60}}]
+        return [{"key": "BSH.Common.Option.FinishInRelative", "value": 7200, "unit": "seconds", "constraints": {"min": 0, "max": 86340, "stepsize": 60}}]
+
+    def next_event(self) -> (str, Dict[str, Any]):
+        self.progress = (self.progress + 1) % 100
+        if self.progress % 10 == 0:
+            self.door = "BSH.Common.EnumType.DoorState.Open" if self.door.endswith("Closed") else "BSH.Common.EnumType.DoorState.Closed"
+            return "STATUS", {"items": [{"key": "BSH.Common.Status.DoorState", "value": self.door, "timestamp": int(time())}], "haId": self.haid}
+        return "NOTIFY", {"items": [{"key": "BSH.Common.Option.ProgramProgress", "value": self.progress, "unit": "%", "timestamp": int(time())},
+                                    {"key": "BSH.Common.Option.RemainingProgramTime", "value": (100 - self.progress) * 60, "unit": "seconds", "timestamp": int(time())}], "haId": self.haid}
+
+
+class StandIn:
+
+    def __init__(self,
+                 num_dishwashers: int = 1,
+                 num_washers: int = 1,
+                 num_dryers: int = 1,
+                 event_rate_per_sec: float = 1,
+                 keep_alive_period_sec: float = 55,
+                 latency_sec: float = 0,
+                 offline_ratio: float = 0,
+                 throttle_ratio: float = 0,
+                 seed: int = 42):
+        self.random = random.Random(seed)
+        self.event_rate_per_sec = event_rate_per_sec
+        self.keep_alive_period_sec = keep_alive_period_sec
+        self.latency_sec = latency_sec
+        self.throttle_ratio = throttle_ratio
+        self.appliances: Dict[str, SimulatedAppliance] = dict()
+        for device_type, count in [("Dishwasher", num_dishwashers), ("Washer", num_washers), ("Dryer", num_dryers)]:
+            for index in range(count):
+                appliance = SimulatedAppliance(device_type, index, self.random.random() < offline_ratio)
+                self.appliances[appliance.haid] = appliance
+        self.subscribers: List[asyncio.Queue] = []
+        self.num_requests = 0
+        self.num_throttled = 0
+        self.num_events = 0
+
+    def is_throttled(self) -> bool:
+        self.num_requests += 1
+        if self.random.random() < self.throttle_ratio:
+            self.num_throttled += 1
+            return True
+        return False
+
+    def publish(self, event_type: str, data: Optional[Dict[str, Any]], haid: Optional[str]):
+        message = "event: " + event_type + "\ndata: " + ("" if data is None else json.dumps(data)) + "\n" + ("" if haid is None else "id: " + haid + "\n") + "\n"
+        self.num_events += 1
+        for queue in self.subscribers:
+            queue.put_nowait(message)
+
+    async def generate_events(self):
+        online = [appliance for appliance in self.appliances.values() if not appliance.offline]
+        last_keep_alive = time()
+        while True:
+            await asyncio.sleep(1 / self.event_rate_per_sec if self.event_rate_per_sec > 0 else 1)
+            if len(self.subscribers) > 0:
+                if self.event_rate_per_sec > 0 and len(online) > 0:
+                    appliance = self.random.choice(online)
+                    event_type, data = appliance.next_event()
+                    self.publish(event_type, data, appliance.haid)
+                if time() - last_keep_alive >= self.keep_alive_period_sec:
+                    last_keep_alive = time()
+                    self.publish("KEEP-ALIVE", None, None)
+
+
+class StandInHandler(tornado.web.RequestHandler):
+
+    def initialize(self, standin: StandIn):
+        self.standin = standin
+
+    async def prepare(self):
+        if self.standin.latency_sec > 0:
+            await asyncio.sleep(self.standin.latency_sec)
+        if self.standin.is_throttled():
+            self.set_status(429)
+            self.set_header("Retry-After", "1")
+            self.finish(json.dumps({"error": {"key": "429", "description": "The rate limit 'requests per minute' was reached"}}))
+
+    def reply(self, data: Dict[str, Any], status: int = 200):
+        self.set_status(status)
+        self.set_header("Content-Type", "application/vnd.bsh.sdk.v1+json")
+        self.finish(json.dumps(data))
+
+    def appliance(self, haid: str) -> Optional[SimulatedAppliance]:
+        appliance = self.standin.appliances.get(haid, None)
+        if appliance is None:
+            self.reply({"error": {"key": "SDK.Error.HomeAppliance.NotFound", "description": haid}}, 404)
+        elif appliance.offline:
+            self.reply(OFFLINE_ERROR, 409)
+            appliance = None
+        return appliance
+
+
+class TokenHandler(StandInHandler):
+
+    def post(self):
+        self.reply({"access_token": "standin-" + str(int(time())), "refresh_token": "standin", "expires_in": 24*60*60, "token_type": "Bearer"})
+
+
+class AppliancesHandler(StandInHandler):
+
+    def get(self):
+        self.reply({"data": {"homeappliances": [appliance.info() for appliance in self.standin.appliances.values()]}})
+
+
+class StatusHandler(StandInHandler):
+
+    def get(self, haid: str):
+        appliance = self.appliance(haid)
+        if appliance is not None:
+            self.reply({"data": {"status": appliance.status()}})
+
+
+class SettingsHandler(StandInHandler):
+
+    def get(self, haid: str):
+        appliance = self.appliance(haid)
+        if appliance is not None:
+            self.reply({"data": {"settings": appliance.settings()}})
+
+
+class SelectedProgramHandler(StandInHandler):
+
+    def get(self, haid: str):
+        appliance = self.appliance(haid)
+        if appliance is not None:
+            self.reply({"data": {"key": appliance.program, "options": []}})
+
+
+class AvailableProgramHandler(StandInHandler):
+
+    def get(self, haid: str, key: str):
+        appliance = self.appliance(haid)
+        if appliance is not None:
+            self.reply({"data": {"key": key, "options": appliance.options()}})
+
+
+class ActiveProgramHandler(StandInHandler):
+
+    def put(self, haid: str, option: str = None):
+        appliance = self.appliance(haid)
+        if appliance is not None:
+            appliance.operation = "BSH.Common.EnumType.OperationState.DelayedStart"
+            self.set_status(204)
+            self.finish()
+            self.standin.publish("STATUS", {"items": [{"key": "BSH.Common.Status.OperationState", "value": appliance.operation, "timestamp": int(time())}], "haId": haid}, haid)
+
+
+class EventsHandler(StandInHandler):
+
+    async def get(self):
+        queue = asyncio.Queue()
+        self.standin.subscribers.append(queue)
+        self.set_header("Content-Type", "text/event-stream")
+        try:
+            self.write("event: KEEP-ALIVE\ndata: \n\n")
+            await self.flush()
+            while True:
+                self.write(await queue.get())
+                await self.flush()
+        except tornado.iostream.StreamClosedError:
+            pass
+        finally:
+            self.standin.subscribers.remove(queue)
+
+
+class StandInServer:
+
+    def __init__(self, standin: StandIn, port: int = 0, host: str = "127.0.0.1"):
+        self.standin = standin
+        self.host = host
+        self.port = port
+        self.__started = Event()
+
+    @property
+    def uri(self) -> str:
+        return "http://" + self.host + ":" + str(self.port)
+
+    def start(self):
+        Thread(target=self.__run, daemon=True).start()
+        self.__started.wait()
+        logging.info("home connect stand-in running on " + self.uri + " (" + str(len(self.standin.appliances)) + " appliances)")
+        return self
+
+    def __run(self):
+        asyncio.run(self.__serve())
+
+    async def __serve(self):
+        args = dict(standin=self.standin)
+        haid = r"/api/homeappliances/([^/]+)"
+        app = tornado.web.Application([(r"/security/oauth/token", TokenHandler, args),
+                                       (r"/api/homeappliances", AppliancesHandler, args),
+                                       (r"/api/homeappliances/events", EventsHandler, args),
+                                       (haid + r"/status", StatusHandler, args),
+                                       (haid + r"/settings", SettingsHandler, args),
+                                       (haid + r"/programs/selected", SelectedProgramHandler, args),
+                                       (haid + r"/programs/available/([^/]+)", AvailableProgramHandler, args),
+                                       (haid + r"/programs/active", ActiveProgramHandler, args),
+                                       (haid + r"/programs/active/options/([^/]+)", ActiveProgramHandler, args)])
+        server = app.listen(self.port, address=self.host)
+        self.port = list(server._sockets.values())[0].getsockname()[1]
+        self.__started.set()
+        await self.standin.generate_events()
+
+    def configure_clients(self):
+        # points the Home Connect clients to the stand-in
+        from auth import Auth
+        from homeconnect import HomeConnect
+        HomeConnect.API_URI = self.uri + "/api"
+        Auth.URI = self.uri + "/security"
+
+
+if __name__ == '__main__':
+    import sys
+    logging.basicConfig(format='%(asctime)s %(name)-20s: %(levelname)-8s %(message)s', level=logging.INFO, datefmt='%Y-%m-%d %H:%M:%S')
+    logging.getLogger('tornado.access').setLevel(logging.ERROR)
+    standin = StandIn(num_dishwashers=int(sys.argv[2]) if len(sys.argv) > 2 else 100,
+                      num_washers=int(sys.argv[3]) if len(sys.argv) > 3 else 100,
+                      num_dryers=int(sys.argv[4]) if len(sys.argv) > 4 else 100,
+                      event_rate_per_sec=float(sys.argv[5]) if len(sys.argv) > 5 else 10)
+    StandInServer(standin, port=int(sys.argv[1]) if len(sys.argv) > 1 else 8080).start()
+    Event().wait()
@@ -0,0 +1,129 @@
+import heapq
+import logging
+from time import monotonic
+from threading import Thread, Condition, Lock
+from typing import Callable, List, Dict, Any, Optional
+
+
+
+class Timer:
+
+    def __init__(self, scheduler, deadline: float, fn: Callable, args, period_sec: Optional[float], name: str):
+        self.__scheduler = scheduler
+        self.deadline = deadline
+        self.fn = fn
+        self.args = args
+        self.period_sec = period_sec
+        self.name = name
+        self.is_cancelled = False
+
+    def cancel(self):
+        self.__scheduler._cancel(self)
+
+    def __lt__(self, other):
+        return self.deadline < other.deadline
+
+    def __str__(self):
+        return self.name
+
+
+class TimerScheduler:
+
+    # a single thread runs all timers. Callbacks have to be short. Long running work should be handed over to an executor
+
+    def __init__(self, thread_name: str = "timer"):
+        self.thread_name = thread_name
+        self.__heap: List[Timer] = []
+        self.__condition = Condition()
+        self.__num_pending = 0
+        self.__thread = None
+        self.num_fired = 0
+        self.num_cancelled = 0
+        self.max_delay_sec = 0.0
+
+    def schedule(self, delay_sec: float, fn: Callable, *args, name: str = None) -> Timer:
+        return self.__add(Timer(self, monotonic() + max(0.0, delay_sec), fn, args, None, fn.__name__ if name is None else name))
+
+    def schedule_periodically(self, period_sec: float, fn: Callable, *args, initial_delay_sec: float = None, name: str = None) -> Timer:
+        delay_sec = period_sec if initial_delay_sec is None else initial_delay_sec
+        return self.__add(Timer(self, monotonic() + max(0.0, delay_sec), fn, args, period_sec, fn.__name__ if name is None else name))
+
+    def __add(self, timer: Timer) -> Timer:
+        with self.__condition:
+            if self.__thread is None:
+                self.__thread = Thread(target=self.__run, name=self.thread_name, daemon=True)
+                self.__thread.start()
+            heapq.heappush(self.__heap, timer)
+            self.__num_pending += 1
+            self.__condition.notify()
+        return timer
+
+    def _cancel(self, timer: Timer):
+        # cancelled timers remain in the heap and are discarded when due. References of the callback are released immediately
+        with self.__condition:
+            if not timer.is_cancelled:
+                timer.is_cancelled = True
+                timer.fn = None
+                timer.args = ()
+                self.__num_pending -= 1
+                self.num_cancelled += 1
+                if len(self.__heap) > 64 and self.__num_pending < len(self.__heap) / 2:
+                    self.__heap = [timer for timer in self.__heap if not timer.is_cancelled]
+                    heapq.heapify(self.__heap)
+
+    @property
+    def pending(self) -> int:
+        return self.__num_pending
+
+    # will be called by a background thread
+    def __run(self):
+        while True:
+            with self.__condition:
+                while True:
+                    while len(self.__heap) > 0 and self.__heap[0].is_cancelled:
+                        heapq.heappop(self.__heap)
+                    if len(self.__heap) == 0:
+                        self.__condition.wait()
+                    else:
+                        wait_sec = self.__heap[0].deadline - monotonic()
+                        if wait_sec <= 0:
+                            break
+                        self.__condition.wait(wait_sec)
+                timer = heapq.heappop(self.__heap)
+                fn, args = timer.fn, timer.args
+                if timer.period_sec is None:
+                    # fired once
+                    timer.is_cancelled = True
+                    timer.fn = None
+                    timer.args = ()
+                    self.__num_pending -= 1
+                now = monotonic()
+                self.max_delay_sec = max(self.max_delay_sec, now - timer.deadline)
+                self.num_fired += 1
+            try:
+                fn(*args)
+            except Exception as e:
+                logging.warning("error occurred running timer " + timer.name + " " + str(e))
+            if timer.period_sec is not None:
+                with self.__condition:
+                    if not timer.is_cancelled:
+                        timer.deadline = max(timer.deadline + timer.period_sec, monotonic())
+                        heapq.heappush(self.__heap, timer)
+
+    def statistics(self) -> Dict[str, Any]:
+        return {"pending": self.pending,
+                "fired": self.num_fired,
+                "cancelled": self.num_cancelled,
+                "max_delay_sec": round(self.max_delay_sec, 3)}
+
+
+_shared_scheduler: Optional[TimerScheduler] = None
+_shared_lock = Lock()
+
+
+def shared_scheduler() -> TimerScheduler:
+    global _shared_scheduler
+    with _shared_lock:
+        if _shared_scheduler is None:
+            _shared_scheduler = TimerScheduler()
+        return _shared_scheduler
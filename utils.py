@@ -1,3 +1,5 @@
+import json
+
 
 
 def print_duration(time: int):
@@ -11,3 +13,13 @@ def print_duration(time: int):
 
 def is_success(status_code: int) -> bool:
     return status_code >= 200 and status_code <= 299
+
+
+def is_offline_error(status_code: int, text: str) -> bool:
+    if status_code == 409:
+        try:
+            msg = json.loads(text)
+            return msg.get("error", {}).get('key', "") == "SDK.Error.HomeAppliance.Connection.Initialization.Failed"
+        except Exception as e:
+            return False
+    return False